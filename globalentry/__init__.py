@@ -1,5 +1,11 @@
-from .globalentry import globalentry
-
-
-def setup(bot):
-    bot.add_cog(globalentry())
\ No newline at end of file
+from .globalentry import GlobalEntry
+
+__red_end_user_data_statement__ = (
+    "This cog stores Discord user IDs, along with the Global Entry locations, dates and "
+    "channels they asked to be notified about, for as long as they keep watching them."
+)
+
+
+async def setup(bot):
+    """Load the GlobalEntry cog"""
+    await bot.add_cog(GlobalEntry(bot))
@@ -1,49 +1,375 @@
-import asyncio
-import traceback
-from datetime import datetime
-import time
-import requests
-import argparse
-import discord
-from redbot.core import Config, checks, commands
-from redbot.core.utils.chat_formatting import humanize_list, inline
-
-# Imported from (https://github.com/jamescalixto/global-entry-scraper)
-
-REQUEST_DELAY = 2
-TIMESLOT_URL = "https://ttp.cbp.dhs.gov/schedulerapi/slots?orderBy=soonest&limit={limit}&locationId={location_id}&minimum=1"
-MAPPING_URL = "https://ttp.cbp.dhs.gov/schedulerapi/locations/?temporary=false&inviteOnly=false&operational=true&serviceName=Global%20Entry"
-
-def import_mapping_from_url() -> dict:
-    """Get mapping of location ids to location names from the TTP website."""
-    r = requests.get(MAPPING_URL)
-    return {
-        location["id"]: "{} ({}, {})".format(
-            location["name"], location["city"], location["state"]
-        )
-        for location in r.json()
-    }
-
-def get_timeslots_for_location_id(location_id: int, limit: int) -> set:
-    """Get list of objects representing open slots for a certain location."""
-    r = requests.get(TIMESLOT_URL.format(location_id=location_id, limit=limit))
-    timeslots = [parse_timeslot_datetime(timeslot) for timeslot in r.json()]
-    return sorted(list(set(timeslots)))
-
-
-def get_timeslots_for_location_ids(
-        location_ids: list, before: str = None, limit: int = 10
-) -> list:
-    """Get a mapping of location ids to open timeslots. Takes in an optional YYYY-MM-DD
-    parameter to filter the results."""
-    all_timeslots = {}
-    for index, location_id in enumerate(location_ids):
-        timeslots = [
-            timeslot
-            for timeslot in get_timeslots_for_location_id(location_id, limit)
-            if before is None or datetime.strptime(before, "%Y-%m-%d") > timeslot
-        ]
-        all_timeslots[location_id] = timeslots
-        if index < len(location_ids) - 1:  # delay between requests.
-            time.sleep(REQUEST_DELAY)
-    return all_timeslots
\ No newline at end of file
+import asyncio
+import logging
+from typing import List, Optional
+
+import aiohttp
+import discord
+from redbot.core import commands, app_commands, Config
+from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
+
+from .scraper import (
+    LocationCache,
+    LocationIndex,
+    format_location,
+    iter_timeslots_for_location_ids,
+    parse_before,
+    timestamp_to_datetime,
+)
+from .watcher import SlotWatcher, Subscriber
+
+log = logging.getLogger("red.globalentry")
+
+# Open slots fetched per location
+SLOT_LIMIT = 10
+# Locations a single user can watch at once, to keep polling of the CBP API polite
+MAX_WATCHES = 5
+# Locations listed per page of /globalentry locations
+LOCATIONS_PER_PAGE = 15
+# Locations shown per page of /globalentry search results
+RESULTS_PER_PAGE = 5
+
+
+def format_slot(timestamp: int) -> str:
+    """Display a slot time, which is local to its enrollment center."""
+    return timestamp_to_datetime(timestamp).strftime("%a %b %d %Y, %I:%M %p")
+
+
+class GlobalEntry(commands.Cog):
+    """
+    Find and watch for open Global Entry interview appointments
+    """
+
+    def __init__(self, bot: Red):
+        self.bot = bot
+        self.config = Config.get_conf(self, identifier=4708213569, force_registration=True)
+        # location id (as a string) -> {"before": YYYY-MM-DD or None, "channel_id": int or None}
+        self.config.register_user(watches={})
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.locations = LocationCache(cog_data_path(self) / "locations.json")
+        self.watcher: Optional[SlotWatcher] = None
+
+    async def cog_load(self):
+        """Called when the cog is loaded. Only touches disk and Config; the CBP API is first
+        called when a command needs it or the watcher's first poll comes up."""
+        self.session = aiohttp.ClientSession()
+        await asyncio.get_running_loop().run_in_executor(None, self.locations.load)
+        self.watcher = SlotWatcher(self.session, self._notify, SLOT_LIMIT, self.telemetry)
+        for user_id, data in (await self.config.all_users()).items():
+            for location_id, watch in data["watches"].items():
+                # Restored watches wait a full interval, so loading the cog doesn't hit the CBP API
+                self.watcher.subscribe(
+                    self._subscriber(user_id, int(location_id), watch), delay=SlotWatcher.MIN_INTERVAL
+                )
+        self.watcher.start()
+        log.info("GlobalEntry cog loaded")
+
+    async def cog_unload(self):
+        """Called when the cog is unloaded"""
+        if self.watcher is not None:
+            self.watcher.stop()
+        if self.session is not None:
+            await self.session.close()
+        log.info("GlobalEntry cog unloaded")
+
+    async def red_delete_data_for_user(self, *, requester, user_id: int):
+        watches = await self.config.user_from_id(user_id).watches()
+        for location_id in watches:
+            self.watcher.unsubscribe(user_id, int(location_id))
+        await self.config.user_from_id(user_id).clear()
+
+    @property
+    def telemetry(self):
+        """The Utility cog's shared HTTP telemetry, if it is loaded."""
+        utility = self.bot.get_cog("Utility")
+        return getattr(utility, "telemetry", None)
+
+    @commands.Cog.listener()
+    async def on_cog_add(self, cog: commands.Cog):
+        if cog.qualified_name == "Utility" and self.watcher is not None:
+            self.watcher.telemetry = self.telemetry
+
+    @staticmethod
+    def _subscriber(user_id: int, location_id: int, watch: dict) -> Subscriber:
+        before = parse_before(watch["before"]) if watch["before"] else None
+        return Subscriber(user_id, location_id, before, watch["channel_id"])
+
+    async def _index(self) -> LocationIndex:
+        return await self.locations.get(self.session, self.telemetry)
+
+    def _resolve_location(self, index: LocationIndex, value: str) -> Optional[int]:
+        """Turn an autocompleted location id, or a search query typed by hand, into a location id."""
+        value = value.strip()
+        if value.isdigit() and int(value) in index:
+            return int(value)
+        matches = index.search(value, limit=1)
+        return matches[0]["id"] if matches else None
+
+    async def _notify(self, subscriber: Subscriber, slots: List[int]):
+        """Tell a watcher about newly opened slots, in their channel or by DM."""
+        name = self.locations.index.name(subscriber.location_id) if self.locations.index else subscriber.location_id
+        content = f"New Global Entry appointments at **{name}**:\n" + "\n".join(
+            f"- {format_slot(slot)}" for slot in slots
+        )
+        if subscriber.channel_id is not None:
+            channel = self.bot.get_channel(subscriber.channel_id)
+            if channel is None:
+                log.warning(f"Watch channel {subscriber.channel_id} for user {subscriber.user_id} is gone")
+                return
+            await channel.send(
+                f"<@{subscriber.user_id}> {content}"[:2000],
+                allowed_mentions=discord.AllowedMentions(users=True)
+            )
+        else:
+            user = self.bot.get_user(subscriber.user_id) or await self.bot.fetch_user(subscriber.user_id)
+            await user.send(content[:2000])
+
+    async def location_autocomplete(
+        self,
+        interaction: discord.Interaction,
+        current: str
+    ) -> List[app_commands.Choice[str]]:
+        """Autocomplete enrollment centers by name, city, state or id"""
+        try:
+            index = await self._index()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return []
+        return [
+            app_commands.Choice(name=format_location(location)[:100], value=str(location["id"]))
+            for location in index.search(current)
+        ]
+
+    globalentry = app_commands.Group(name="globalentry", description="Global Entry appointment lookups")
+
+    @globalentry.command(name="search", description="Find open Global Entry appointments")
+    @app_commands.describe(
+        location="Enrollment center to check",
+        state="Check every enrollment center in a state instead, e.g. CA",
+        before="Only show appointments before this date (YYYY-MM-DD)"
+    )
+    @app_commands.autocomplete(location=location_autocomplete)
+    async def search(
+        self,
+        interaction: discord.Interaction,
+        location: Optional[str] = None,
+        state: Optional[str] = None,
+        before: Optional[str] = None
+    ):
+        """Find open Global Entry appointments"""
+        if location is None and state is None:
+            await interaction.response.send_message("Pick a location or a state to search.", ephemeral=True)
+            return
+        if before is not None:
+            try:
+                parse_before(before)
+            except ValueError:
+                await interaction.response.send_message("Dates must look like YYYY-MM-DD.", ephemeral=True)
+                return
+
+        await interaction.response.defer(thinking=True)
+        try:
+            index = await self._index()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            await interaction.followup.send("Couldn't reach the Global Entry website, try again later.")
+            return
+
+        if location is not None:
+            location_id = self._resolve_location(index, location)
+            if location_id is None:
+                await interaction.followup.send(f"No enrollment center matches `{location}`.")
+                return
+            location_ids = [location_id]
+        else:
+            location_ids = [loc["id"] for loc in index.by_state.get(state.strip().upper(), [])]
+            if not location_ids:
+                await interaction.followup.send(f"No enrollment centers found in `{state}`.")
+                return
+
+        results = {
+            location_id: slots
+            async for location_id, slots in iter_timeslots_for_location_ids(
+                self.session, location_ids, before, SLOT_LIMIT, telemetry=self.telemetry
+            )
+            if slots
+        }
+        if not results:
+            await interaction.followup.send("No open appointments found.")
+            return
+
+        # Soonest appointment first
+        ordered = sorted(results.items(), key=lambda item: item[1][0])
+        pages = []
+        for start in range(0, len(ordered), RESULTS_PER_PAGE):
+            embed = discord.Embed(
+                title="Open Global Entry appointments",
+                description=f"Before {before}" if before else None,
+                color=discord.Color.blue()
+            )
+            for location_id, slots in ordered[start:start + RESULTS_PER_PAGE]:
+                embed.add_field(
+                    name=index.name(location_id)[:256],
+                    value="\n".join(format_slot(slot) for slot in slots),
+                    inline=False
+                )
+            pages.append(embed)
+        await PaginatedEmbedView.send(interaction, pages)
+
+    @globalentry.command(name="watch", description="Get notified when new Global Entry appointments open up")
+    @app_commands.describe(
+        location="Enrollment center to watch",
+        before="Only notify about appointments before this date (YYYY-MM-DD)",
+        channel="Post notifications in this channel instead of DMing you"
+    )
+    @app_commands.autocomplete(location=location_autocomplete)
+    async def watch(
+        self,
+        interaction: discord.Interaction,
+        location: str,
+        before: Optional[str] = None,
+        channel: Optional[discord.TextChannel] = None
+    ):
+        """Get notified when new Global Entry appointments open up"""
+        if before is not None:
+            try:
+                parse_before(before)
+            except ValueError:
+                await interaction.response.send_message("Dates must look like YYYY-MM-DD.", ephemeral=True)
+                return
+        if channel is not None and not channel.permissions_for(interaction.user).send_messages:
+            await interaction.response.send_message(f"You can't post in {channel.mention}.", ephemeral=True)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            index = await self._index()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            await interaction.followup.send("Couldn't reach the Global Entry website, try again later.")
+            return
+        location_id = self._resolve_location(index, location)
+        if location_id is None:
+            await interaction.followup.send(f"No enrollment center matches `{location}`.")
+            return
+
+        watch = {"before": before, "channel_id": channel.id if channel else None}
+        async with self.config.user(interaction.user).watches() as watches:
+            if str(location_id) not in watches and len(watches) >= MAX_WATCHES:
+                await interaction.followup.send(
+                    f"You can watch at most {MAX_WATCHES} locations. Use `/globalentry unwatch` to drop one."
+                )
+                return
+            watches[str(location_id)] = watch
+            watching = [index.name(int(watched)) for watched in watches]
+        self.watcher.subscribe(self._subscriber(interaction.user.id, location_id, watch))
+
+        where = channel.mention if channel else "your DMs"
+        await interaction.followup.send(
+            f"Watching **{index.name(location_id)}**"
+            + (f" for appointments before {before}" if before else "")
+            + f". New appointments will be posted in {where}.\n\nYou're watching:\n"
+            + "\n".join(f"- {name}" for name in watching)
+        )
+
+    @globalentry.command(name="unwatch", description="Stop watching a Global Entry location")
+    @app_commands.describe(location="Enrollment center to stop watching")
+    @app_commands.autocomplete(location=location_autocomplete)
+    async def unwatch(self, interaction: discord.Interaction, location: str):
+        """Stop watching a Global Entry location"""
+        watches = await self.config.user(interaction.user).watches()
+        location_id = int(location) if location.strip().isdigit() else None
+        if location_id is None and self.locations.index is not None:
+            location_id = self._resolve_location(self.locations.index, location)
+        if location_id is None or str(location_id) not in watches:
+            await interaction.response.send_message("You aren't watching that location.", ephemeral=True)
+            return
+
+        async with self.config.user(interaction.user).watches() as watches:
+            watches.pop(str(location_id), None)
+        self.watcher.unsubscribe(interaction.user.id, location_id)
+        name = self.locations.index.name(location_id) if self.locations.index else location_id
+        await interaction.response.send_message(f"Stopped watching **{name}**.", ephemeral=True)
+
+    @globalentry.command(name="locations", description="List Global Entry enrollment centers")
+    @app_commands.describe(state="Only list enrollment centers in this state, e.g. CA")
+    async def locations_command(self, interaction: discord.Interaction, state: Optional[str] = None):
+        """List Global Entry enrollment centers"""
+        await interaction.response.defer(thinking=True)
+        try:
+            index = await self._index()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            await interaction.followup.send("Couldn't reach the Global Entry website, try again later.")
+            return
+
+        if state is not None:
+            locations = index.by_state.get(state.strip().upper(), [])
+        else:
+            locations = list(index.by_id.values())
+        if not locations:
+            await interaction.followup.send(f"No enrollment centers found in `{state}`.")
+            return
+
+        lines = [f"`{location['id']}` {format_location(location)}" for location in locations]
+        pages = [
+            discord.Embed(
+                title=f"Global Entry enrollment centers{f' in {state.upper()}' if state else ''}",
+                description="\n".join(lines[start:start + LOCATIONS_PER_PAGE]),
+                color=discord.Color.blue()
+            )
+            for start in range(0, len(lines), LOCATIONS_PER_PAGE)
+        ]
+        await PaginatedEmbedView.send(interaction, pages)
+
+
+class PaginatedEmbedView(discord.ui.View):
+    """View with buttons to page through a list of embeds"""
+
+    def __init__(self, pages: List[discord.Embed], user_id: int):
+        super().__init__(timeout=180.0)
+        self.pages = pages
+        self.user_id = user_id
+        self.page = 0
+        self.message: Optional[discord.Message] = None
+        for number, page in enumerate(pages, 1):
+            page.set_footer(text=f"Page {number}/{len(pages)}")
+        self._update_buttons()
+
+    @classmethod
+    async def send(cls, interaction: discord.Interaction, pages: List[discord.Embed]):
+        """Send the first page as a follow-up, with buttons only if there is more than one page."""
+        if len(pages) == 1:
+            await interaction.followup.send(embed=pages[0])
+            return
+        view = cls(pages, interaction.user.id)
+        view.message = await interaction.followup.send(embed=pages[0], view=view, wait=True)
+
+    def _update_buttons(self):
+        self.previous_button.disabled = self.page == 0
+        self.next_button.disabled = self.page == len(self.pages) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """Only allow the user who ran the command to page through the results"""
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("These aren't your results!", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        self.page = page
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.pages[page], view=self)
+
+    @discord.ui.button(label="Previous", style=discord.ButtonStyle.secondary)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page + 1)
@@ -0,0 +1,345 @@
+import asyncio
+import calendar
+import json
+import logging
+import re
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+import aiohttp
+
+# Imported from (https://github.com/jamescalixto/global-entry-scraper)
+
+log = logging.getLogger("red.globalentry")
+
+# Minimum seconds between the start of any two requests to the CBP API, across all scans
+REQUEST_INTERVAL = 0.5
+# Locations fetched at the same time by one scan
+MAX_CONCURRENCY = 5
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=15, connect=5)
+# Seconds before the cached location list is revalidated with the CBP API
+MAPPING_TTL = 24 * 60 * 60
+# Location fields kept in the on-disk cache
+LOCATION_FIELDS = ("id", "name", "city", "state", "countryCode")
+TIMESLOT_URL = "https://ttp.cbp.dhs.gov/schedulerapi/slots?orderBy=soonest&limit={limit}&locationId={location_id}&minimum=1"
+MAPPING_URL = "https://ttp.cbp.dhs.gov/schedulerapi/locations/?temporary=false&inviteOnly=false&operational=true&serviceName=Global%20Entry"
+
+
+class PoliteRateLimiter:
+    """Spaces out request starts so concurrent scans never hit the CBP API faster than one per interval."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._next_slot = 0.0
+
+    async def wait(self):
+        """Reserve the next request slot and sleep until it comes up."""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# Shared by every scan in the process
+polite_limiter = PoliteRateLimiter(REQUEST_INTERVAL)
+
+
+class _NullTimer:
+    """Stand-in for the Utility cog's request timer when no telemetry was given."""
+
+    status = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _track(telemetry, endpoint: str):
+    """Time a request through the Utility cog's HTTP telemetry, if it was given."""
+    if telemetry is None:
+        return _NullTimer()
+    return telemetry.track(endpoint)
+
+
+@lru_cache(maxsize=1024)
+def _day_epoch(day: str) -> int:
+    return calendar.timegm((int(day[0:4]), int(day[5:7]), int(day[8:10]), 0, 0, 0))
+
+
+def parse_timestamp(value: str) -> int:
+    """Convert a scheduler API "YYYY-MM-DDTHH:MM" time to epoch seconds.
+
+    Slot times are local to each enrollment center, so they are treated as if
+    they were UTC; comparisons between them stay correct either way. The day
+    part is cached since a location's slots mostly share a handful of dates.
+    """
+    return _day_epoch(value[:10]) + int(value[11:13]) * 3600 + int(value[14:16]) * 60
+
+
+def parse_before(before: str) -> int:
+    """Convert a YYYY-MM-DD cutoff date to the same epoch scale as parse_timestamp."""
+    return calendar.timegm(datetime.strptime(before, "%Y-%m-%d").timetuple())
+
+
+def timestamp_to_datetime(timestamp: int) -> datetime:
+    """Turn a parsed slot time back into a naive local datetime for display."""
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def parse_timeslots(timeslots: Iterable[dict]) -> array:
+    """Parse slot objects into a sorted, duplicate-free array of epoch seconds in one pass.
+
+    The API already returns slots soonest first, so sorting is only needed if it ever doesn't.
+    """
+    slots = array("q")
+    ordered = True
+    for timeslot in timeslots:
+        timestamp = parse_timestamp(timeslot["startTimestamp"])
+        if slots:
+            if timestamp == slots[-1]:
+                continue
+            if timestamp < slots[-1]:
+                ordered = False
+        slots.append(timestamp)
+    if not ordered:
+        slots = array("q", sorted(set(slots)))
+    return slots
+
+
+def format_location(location: dict) -> str:
+    """Display name of a location, e.g. "Name (City, ST)"."""
+    return "{} ({}, {})".format(location["name"], location["city"], location["state"])
+
+
+class LocationIndex:
+    """In-memory index of enrollment centers by id, state, city and search prefix."""
+
+    def __init__(self, locations: List[dict]):
+        self.by_id: Dict[int, dict] = {}
+        self.by_state: Dict[str, List[dict]] = defaultdict(list)
+        self.by_city: Dict[str, List[dict]] = defaultdict(list)
+        # Every prefix of every word in a location's name, city and state -> location ids
+        self._prefixes: Dict[str, List[int]] = defaultdict(list)
+
+        for location in sorted(locations, key=lambda l: (l["state"] or "", l["city"] or "", l["name"] or "")):
+            location_id = location["id"]
+            self.by_id[location_id] = location
+            self.by_state[(location["state"] or "").upper()].append(location)
+            self.by_city[(location["city"] or "").lower()].append(location)
+            words = {str(location_id)}
+            for field in ("name", "city", "state"):
+                words.update(re.findall(r"\w+", (location[field] or "").lower()))
+            prefixes = {word[:end] for word in words for end in range(1, len(word) + 1)}
+            for prefix in prefixes:
+                self._prefixes[prefix].append(location_id)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, location_id: int) -> bool:
+        return location_id in self.by_id
+
+    def name(self, location_id: int) -> str:
+        location = self.by_id.get(location_id)
+        return format_location(location) if location is not None else f"Unknown location ({location_id})"
+
+    def mapping(self) -> dict:
+        """Mapping of location ids to display names."""
+        return {location_id: format_location(location) for location_id, location in self.by_id.items()}
+
+    def search(self, query: str, limit: int = 25) -> List[dict]:
+        """Locations matching every word of the query as a prefix, for autocomplete."""
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return list(self.by_id.values())[:limit]
+        matches = None
+        for word in words:
+            ids = self._prefixes.get(word, ())
+            if matches is None:
+                matches = list(ids)
+            else:
+                ids = set(ids)
+                matches = [location_id for location_id in matches if location_id in ids]
+            if not matches:
+                return []
+        return [self.by_id[location_id] for location_id in matches[:limit]]
+
+
+class LocationCache:
+    """
+    CBP location list cached on disk, or only in memory if no path is given.
+
+    Once the TTL runs out the list is revalidated with ETag/If-Modified-Since,
+    so an unchanged list costs a 304 instead of a full download. If the API
+    can't be reached, the stale list keeps being served.
+    """
+
+    def __init__(self, path: Optional[Path], ttl: float = MAPPING_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.index: Optional[LocationIndex] = None
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def load(self) -> bool:
+        """Load the cached list from disk without touching the network. Returns whether there was one."""
+        if self.path is None:
+            return False
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.index = LocationIndex(cached["locations"])
+        self.etag = cached.get("etag")
+        self.last_modified = cached.get("last_modified")
+        self.fetched_at = cached.get("fetched_at", 0.0)
+        return True
+
+    def _save(self):
+        if self.path is None:
+            return
+        cached = {
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "fetched_at": self.fetched_at,
+            "locations": list(self.index.by_id.values()),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            json.dump(cached, f)
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.index is not None and time.time() - self.fetched_at < self.ttl
+
+    async def get(self, session: aiohttp.ClientSession, telemetry=None) -> LocationIndex:
+        """The location index, revalidated first if the TTL has run out."""
+        if self.index is None:
+            await asyncio.get_running_loop().run_in_executor(None, self.load)
+        if self.is_fresh:
+            return self.index
+        async with self._lock:
+            if not self.is_fresh:
+                try:
+                    await self._refresh(session, telemetry)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if self.index is None:
+                        raise
+                    log.warning(f"Could not refresh Global Entry locations, using the cached list: {e!r}")
+        return self.index
+
+    async def _refresh(self, session: aiohttp.ClientSession, telemetry=None):
+        headers = {}
+        if self.index is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        await polite_limiter.wait()
+        async with _track(telemetry, "cbp.locations") as timer, session.get(
+            MAPPING_URL, headers=headers, timeout=REQUEST_TIMEOUT
+        ) as r:
+            timer.status = r.status
+            if r.status == 304:
+                log.debug("Global Entry locations unchanged")
+                locations = None
+            else:
+                r.raise_for_status()
+                locations = await r.json(content_type=None)
+                self.etag = r.headers.get("ETag")
+                self.last_modified = r.headers.get("Last-Modified")
+
+        if locations is not None:
+            self.index = LocationIndex(
+                [{field: location.get(field) for field in LOCATION_FIELDS} for location in locations]
+            )
+        self.fetched_at = time.time()
+        await asyncio.get_running_loop().run_in_executor(None, self._save)
+
+
+async def import_mapping_from_url(
+        session: aiohttp.ClientSession, cache: Optional[LocationCache] = None, telemetry=None
+) -> dict:
+    """Get mapping of location ids to location names from the TTP website. With a cache,
+    the list is only downloaded again once it has expired and changed."""
+    if cache is None:
+        cache = LocationCache(None)
+    return (await cache.get(session, telemetry)).mapping()
+
+
+async def get_timeslots_for_location_id(
+        session: aiohttp.ClientSession, location_id: int, limit: int, telemetry=None
+) -> array:
+    """Get sorted array of open slot times (epoch seconds, see parse_timestamp) for a certain location."""
+    await polite_limiter.wait()
+    url = TIMESLOT_URL.format(location_id=location_id, limit=limit)
+    async with _track(telemetry, "cbp.slots") as timer, session.get(url, timeout=REQUEST_TIMEOUT) as r:
+        timer.status = r.status
+        r.raise_for_status()
+        timeslots = await r.json()
+    return parse_timeslots(timeslots)
+
+
+async def iter_timeslots_for_location_ids(
+        session: aiohttp.ClientSession,
+        location_ids: Iterable[int],
+        before: str = None,
+        limit: int = 10,
+        concurrency: int = MAX_CONCURRENCY,
+        telemetry=None
+) -> AsyncIterator[Tuple[int, array]]:
+    """Yield (location id, open timeslots) as each location finishes, fetching up to `concurrency`
+    locations at once. Takes in an optional YYYY-MM-DD parameter to filter the results.
+    Locations that fail to load are logged and skipped."""
+    cutoff = parse_before(before) if before is not None else None
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(location_id: int) -> Tuple[int, array]:
+        async with semaphore:
+            return location_id, await get_timeslots_for_location_id(session, location_id, limit, telemetry)
+
+    tasks = [asyncio.ensure_future(fetch(location_id)) for location_id in location_ids]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                location_id, timeslots = await next_done
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.warning(f"Could not fetch Global Entry slots: {e!r}")
+                continue
+            if cutoff is not None:
+                timeslots = timeslots[:bisect_left(timeslots, cutoff)]
+            yield location_id, timeslots
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def get_timeslots_for_location_ids(
+        session: aiohttp.ClientSession, location_ids: list, before: str = None, limit: int = 10, telemetry=None
+) -> dict:
+    """Get a mapping of location ids to open timeslots. Takes in an optional YYYY-MM-DD
+    parameter to filter the results."""
+    return {
+        location_id: timeslots
+        async for location_id, timeslots in iter_timeslots_for_location_ids(
+            session, location_ids, before, limit, telemetry=telemetry
+        )
+    }
@@ -0,0 +1,65 @@
+import asyncio
+import functools
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from typing import Dict, List, Union
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from globalentry import scraper
+
+
+def run_async(test):
+    """Run a coroutine test function in its own event loop, so no asyncio pytest plugin is needed."""
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        return asyncio.run(test(*args, **kwargs))
+    return wrapper
+
+
+@pytest.fixture(autouse=True)
+def no_polite_delay(monkeypatch):
+    # Stub servers don't need protecting, and the delay would swamp what the tests measure
+    monkeypatch.setattr(scraper.polite_limiter, "interval", 0)
+
+
+@asynccontextmanager
+async def stub_scheduler(
+        monkeypatch, slots: Dict[int, List[str]], latency: Union[float, Dict[int, float]] = 0.0
+):
+    """Serve schedulerapi/slots locally and point the scraper at it.
+
+    `slots` maps location ids to their startTimestamps, soonest first. Responses
+    are held back by `latency` seconds, or by a per location id latency.
+    """
+    async def get_slots(request):
+        location_id = int(request.query["locationId"])
+        await asyncio.sleep(latency.get(location_id, 0.0) if isinstance(latency, dict) else latency)
+        limit = int(request.query["limit"])
+        return web.json_response([
+            {"locationId": location_id, "startTimestamp": timestamp, "endTimestamp": timestamp, "active": True}
+            for timestamp in slots.get(location_id, [])[:limit]
+        ])
+
+    app = web.Application()
+    app.router.add_get("/schedulerapi/slots", get_slots)
+    async with TestServer(app) as server:
+        monkeypatch.setattr(
+            scraper,
+            "TIMESLOT_URL",
+            str(server.make_url("/schedulerapi/slots")) + "?orderBy=soonest&limit={limit}&locationId={location_id}&minimum=1"
+        )
+        yield server
+
+
+def synthetic_slots(count: int, start_day: int = 1) -> List[str]:
+    """`count` slot times, soonest first, every 15 minutes from 8am to 5pm starting on the given day of 2025."""
+    slots = []
+    day = date(2025, 1, start_day)
+    while len(slots) < count:
+        for minute in range(8 * 60, 17 * 60, 15):
+            slots.append(f"{day.isoformat()}T{minute // 60:02d}:{minute % 60:02d}")
+        day += timedelta(days=1)
+    return slots[:count]
@@ -0,0 +1,32 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from globalentry.scraper import MAX_CONCURRENCY, iter_timeslots_for_location_ids
+
+from .conftest import stub_scheduler, synthetic_slots
+
+LOCATIONS = 100
+# Round-trip time of one CBP request
+LATENCY = 0.05
+
+
+def test_scan_100_locations(benchmark, monkeypatch):
+    slots = {location_id: synthetic_slots(10) for location_id in range(LOCATIONS)}
+    elapsed = []
+
+    async def scan():
+        async with stub_scheduler(monkeypatch, slots, LATENCY), aiohttp.ClientSession() as session:
+            start = time.perf_counter()
+            results = [result async for result in iter_timeslots_for_location_ids(session, list(slots))]
+            elapsed.append(time.perf_counter() - start)
+        assert len(results) == LOCATIONS
+
+    benchmark.pedantic(lambda: asyncio.run(scan()), rounds=3, iterations=1)
+    # Fetched MAX_CONCURRENCY at a time, instead of one after the other
+    sequential = LOCATIONS * LATENCY
+    assert max(elapsed) < sequential / MAX_CONCURRENCY * 2
@@ -0,0 +1,91 @@
+import calendar
+from datetime import datetime
+
+import aiohttp
+
+from globalentry.scraper import (
+    get_timeslots_for_location_ids,
+    iter_timeslots_for_location_ids,
+    parse_before,
+    parse_timeslots,
+    parse_timestamp,
+    timestamp_to_datetime,
+)
+
+from .conftest import run_async, stub_scheduler, synthetic_slots
+
+
+def epoch(*args) -> int:
+    return calendar.timegm(datetime(*args).timetuple())
+
+
+def payload(*timestamps):
+    return [{"locationId": 5140, "startTimestamp": timestamp} for timestamp in timestamps]
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("2025-01-10T08:30") == epoch(2025, 1, 10, 8, 30)
+    assert parse_timestamp("2024-02-29T23:45") == epoch(2024, 2, 29, 23, 45)
+    assert timestamp_to_datetime(parse_timestamp("2025-01-10T08:30")) == datetime(2025, 1, 10, 8, 30)
+
+
+def test_parse_before_matches_slot_scale():
+    assert parse_before("2025-01-10") == parse_timestamp("2025-01-10T00:00")
+
+
+def test_parse_timeslots_sorted():
+    slots = parse_timeslots(payload("2025-01-10T08:00", "2025-01-10T08:15", "2025-01-11T09:00"))
+    assert list(slots) == [epoch(2025, 1, 10, 8), epoch(2025, 1, 10, 8, 15), epoch(2025, 1, 11, 9)]
+
+
+def test_parse_timeslots_drops_duplicates():
+    slots = parse_timeslots(payload("2025-01-10T08:00", "2025-01-10T08:00", "2025-01-10T08:15"))
+    assert list(slots) == [epoch(2025, 1, 10, 8), epoch(2025, 1, 10, 8, 15)]
+
+
+def test_parse_timeslots_sorts_out_of_order_payload():
+    slots = parse_timeslots(payload("2025-01-11T09:00", "2025-01-10T08:00", "2025-01-11T09:00", "2025-01-10T08:15"))
+    assert list(slots) == [epoch(2025, 1, 10, 8), epoch(2025, 1, 10, 8, 15), epoch(2025, 1, 11, 9)]
+
+
+def test_parse_timeslots_empty():
+    assert list(parse_timeslots([])) == []
+
+
+@run_async
+async def test_before_cuts_off_at_midnight(monkeypatch):
+    slots = {
+        5140: ["2025-01-09T16:45", "2025-01-10T00:00", "2025-01-10T08:00"],
+        5180: ["2025-01-12T08:00"],
+        5300: [],
+    }
+    async with stub_scheduler(monkeypatch, slots), aiohttp.ClientSession() as session:
+        everything = await get_timeslots_for_location_ids(session, list(slots))
+        before = await get_timeslots_for_location_ids(session, list(slots), before="2025-01-10")
+
+    assert {location_id: len(timeslots) for location_id, timeslots in everything.items()} == {5140: 3, 5180: 1, 5300: 0}
+    # Slots on the cutoff date itself are left out
+    assert {location_id: list(timeslots) for location_id, timeslots in before.items()} == {
+        5140: [epoch(2025, 1, 9, 16, 45)],
+        5180: [],
+        5300: [],
+    }
+
+
+@run_async
+async def test_limit_is_passed_on(monkeypatch):
+    async with stub_scheduler(monkeypatch, {5140: synthetic_slots(50)}), aiohttp.ClientSession() as session:
+        slots = await get_timeslots_for_location_ids(session, [5140], limit=10)
+    assert len(slots[5140]) == 10
+
+
+@run_async
+async def test_results_stream_as_they_complete(monkeypatch):
+    slots = {location_id: synthetic_slots(3) for location_id in (5140, 5180, 5300)}
+    latency = {5140: 0.3, 5180: 0.0, 5300: 0.1}
+    async with stub_scheduler(monkeypatch, slots, latency), aiohttp.ClientSession() as session:
+        order = [
+            location_id
+            async for location_id, _ in iter_timeslots_for_location_ids(session, [5140, 5180, 5300], concurrency=3)
+        ]
+    assert order == [5180, 5300, 5140]
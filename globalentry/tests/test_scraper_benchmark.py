@@ -0,0 +1,30 @@
+from bisect import bisect_left
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from globalentry.scraper import parse_before, parse_timeslots
+
+from .conftest import synthetic_slots
+
+# A location with a big backlog, far beyond the usual limit of 10
+PAYLOAD = [{"locationId": 5140, "startTimestamp": timestamp} for timestamp in synthetic_slots(10_000)]
+
+
+def test_parse_timeslots(benchmark):
+    slots = benchmark(parse_timeslots, PAYLOAD)
+    assert len(slots) == len(PAYLOAD)
+
+
+def test_parse_timeslots_out_of_order(benchmark):
+    payload = PAYLOAD[1:] + PAYLOAD[:1]
+    slots = benchmark(parse_timeslots, payload)
+    assert len(slots) == len(PAYLOAD)
+
+
+def test_cutoff(benchmark):
+    slots = parse_timeslots(PAYLOAD)
+    cutoff = parse_before("2025-03-01")
+    before = benchmark(lambda: slots[:bisect_left(slots, cutoff)])
+    assert before and before[-1] < cutoff <= slots[len(before)]
@@ -0,0 +1,25 @@
+from array import array
+
+from globalentry.watcher import diff_sorted
+
+
+def test_diff_sorted():
+    assert diff_sorted([1, 3, 5], [2, 3, 6]) == ([2, 6], [1, 5])
+
+
+def test_diff_sorted_unchanged():
+    assert diff_sorted([1, 2, 3], [1, 2, 3]) == ([], [])
+
+
+def test_diff_sorted_from_empty():
+    assert diff_sorted([], [1, 2]) == ([1, 2], [])
+    assert diff_sorted([1, 2], []) == ([], [1, 2])
+
+
+def test_diff_sorted_disjoint():
+    assert diff_sorted([1, 2], [3, 4]) == ([3, 4], [1, 2])
+    assert diff_sorted([3, 4], [1, 2]) == ([1, 2], [3, 4])
+
+
+def test_diff_sorted_arrays():
+    assert diff_sorted(array("q", [10, 20, 30]), array("q", [20, 25, 30, 40])) == ([25, 40], [10])
@@ -0,0 +1,273 @@
+import asyncio
+import heapq
+import logging
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+import aiohttp
+
+from .scraper import MAX_CONCURRENCY, get_timeslots_for_location_id
+
+log = logging.getLogger("red.globalentry.watcher")
+
+
+class Subscriber(NamedTuple):
+    """Someone waiting for new slots at a location."""
+
+    user_id: int
+    location_id: int
+    # Only slots earlier than this (epoch seconds, see parse_before) are reported; None reports every new slot
+    before: Optional[int] = None
+    # Channel to post in, or None to DM the user
+    channel_id: Optional[int] = None
+
+
+class SubscriptionRegistry:
+    """
+    Subscribers grouped by location, so one poll serves everyone watching it.
+
+    Each location's subscribers are kept sorted by their `before` date with a
+    parallel list of keys. Matching new slots is then a bisect: only
+    subscribers whose cutoff is past the earliest new slot are visited.
+    """
+
+    def __init__(self):
+        # location id -> (sorted before keys, subscribers in the same order)
+        self._by_location: Dict[int, Tuple[list, List[Subscriber]]] = {}
+        self._by_user: Dict[int, Set[int]] = {}
+
+    @staticmethod
+    def _key(subscriber: Subscriber) -> float:
+        return subscriber.before if subscriber.before is not None else float("inf")
+
+    def __len__(self) -> int:
+        return sum(len(subscribers) for _, subscribers in self._by_location.values())
+
+    def __contains__(self, location_id: int) -> bool:
+        return location_id in self._by_location
+
+    def locations(self) -> List[int]:
+        """Distinct location ids with at least one subscriber."""
+        return list(self._by_location)
+
+    def for_location(self, location_id: int) -> List[Subscriber]:
+        return list(self._by_location.get(location_id, ((), ()))[1])
+
+    def for_user(self, user_id: int) -> List[Subscriber]:
+        return [
+            subscriber
+            for location_id in self._by_user.get(user_id, ())
+            for subscriber in self._by_location[location_id][1]
+            if subscriber.user_id == user_id
+        ]
+
+    def add(self, subscriber: Subscriber):
+        """Add a subscriber, replacing the user's previous subscription to the same location."""
+        self.remove(subscriber.user_id, subscriber.location_id)
+        keys, subscribers = self._by_location.setdefault(subscriber.location_id, ([], []))
+        key = self._key(subscriber)
+        index = bisect_right(keys, key)
+        keys.insert(index, key)
+        subscribers.insert(index, subscriber)
+        self._by_user.setdefault(subscriber.user_id, set()).add(subscriber.location_id)
+
+    def remove(self, user_id: int, location_id: int) -> bool:
+        """Remove a user's subscription to a location. Returns whether there was one."""
+        if location_id not in self._by_user.get(user_id, ()):
+            return False
+        keys, subscribers = self._by_location[location_id]
+        index = next(i for i, subscriber in enumerate(subscribers) if subscriber.user_id == user_id)
+        del keys[index]
+        del subscribers[index]
+        if not subscribers:
+            del self._by_location[location_id]
+        self._by_user[user_id].discard(location_id)
+        if not self._by_user[user_id]:
+            del self._by_user[user_id]
+        return True
+
+    def matches(self, location_id: int, added: list) -> Iterator[Tuple[Subscriber, list]]:
+        """Yield (subscriber, slots) for every subscriber with new slots before their cutoff.
+
+        `added` must be sorted.
+        """
+        if not added or location_id not in self._by_location:
+            return
+        keys, subscribers = self._by_location[location_id]
+        # Subscribers whose cutoff is at or before the earliest new slot can't match anything
+        for index in range(bisect_right(keys, added[0]), len(subscribers)):
+            yield subscribers[index], added[:bisect_left(added, keys[index])]
+
+
+class LocationState:
+    """What the watcher last saw at a location and when to look again."""
+
+    __slots__ = ("slots", "interval", "next_poll")
+
+    def __init__(self, interval: float):
+        # Sorted slot times from the last successful poll, or None before the first one
+        self.slots: Optional[array] = None
+        self.interval = interval
+        self.next_poll = 0.0
+
+
+def diff_sorted(old: Sequence[int], new: Sequence[int]) -> Tuple[list, list]:
+    """Return (added, removed) between two sorted, duplicate-free sequences in one merge pass."""
+    added, removed = [], []
+    i = j = 0
+    while i < len(old) and j < len(new):
+        if old[i] == new[j]:
+            i += 1
+            j += 1
+        elif old[i] < new[j]:
+            removed.append(old[i])
+            i += 1
+        else:
+            added.append(new[j])
+            j += 1
+    removed.extend(old[i:])
+    added.extend(new[j:])
+    return added, removed
+
+
+class SlotWatcher:
+    """
+    Background poller that reports newly opened Global Entry slots.
+
+    Polling is per distinct location, not per subscriber: every poll is fanned
+    out to all of the location's subscribers through the registry.
+
+    Each watched location keeps the sorted slot list from its last poll, and
+    every poll is diffed against it so only slots that just appeared are
+    reported. Locations are polled on their own interval, which backs off while
+    nothing changes and tightens when slots come and go quickly.
+    """
+
+    MIN_INTERVAL = 60
+    MAX_INTERVAL = 30 * 60
+    # Interval multiplier after a poll with no changes
+    BACKOFF = 1.5
+    # Added plus removed slots in one poll that count as high churn
+    CHURN_THRESHOLD = 3
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        notify: Callable[[Subscriber, List[int]], Awaitable],
+        limit: int = 10,
+        telemetry=None
+    ):
+        self.session = session
+        self.notify = notify
+        self.limit = limit
+        self.telemetry = telemetry
+        self.subscriptions = SubscriptionRegistry()
+        self.states: Dict[int, LocationState] = {}
+        # (next poll time, location id); entries are skipped once they no longer match the state
+        self._schedule = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, subscriber: Subscriber, delay: float = 0):
+        """Start reporting new slots at the subscriber's location to them.
+        A location that isn't watched yet is first polled after `delay` seconds."""
+        self.subscriptions.add(subscriber)
+        if subscriber.location_id not in self.states:
+            self.states[subscriber.location_id] = LocationState(self.MIN_INTERVAL)
+            self._reschedule(subscriber.location_id, time.monotonic() + delay)
+
+    def unsubscribe(self, user_id: int, location_id: int) -> bool:
+        """Stop reporting a location to a user. Returns whether they were subscribed."""
+        if not self.subscriptions.remove(user_id, location_id):
+            return False
+        if location_id not in self.subscriptions:
+            # Nobody left, stop polling the location
+            del self.states[location_id]
+        return True
+
+    def _reschedule(self, location_id: int, when: float):
+        self.states[location_id].next_poll = when
+        heapq.heappush(self._schedule, (when, location_id))
+        self._wake.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            now = time.monotonic()
+            due = []
+            while self._schedule and self._schedule[0][0] <= now:
+                when, location_id = heapq.heappop(self._schedule)
+                state = self.states.get(location_id)
+                if state is not None and state.next_poll == when:
+                    due.append(location_id)
+
+            if due:
+                semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+
+                async def poll(location_id):
+                    async with semaphore:
+                        await self.poll(location_id)
+
+                await asyncio.gather(*(poll(location_id) for location_id in due))
+                continue
+
+            timeout = self._schedule[0][0] - now if self._schedule else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll(self, location_id: int):
+        """Fetch a location, report slots that appeared since the last poll and schedule the next one."""
+        state = self.states.get(location_id)
+        if state is None:
+            return
+        try:
+            slots = await get_timeslots_for_location_id(self.session, location_id, self.limit, self.telemetry)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log.warning(f"Could not poll Global Entry location {location_id}: {e!r}")
+            slots = None
+        except Exception:
+            # E.g. a malformed payload; keep polling rather than letting it end the watcher
+            log.exception(f"Unexpected error polling Global Entry location {location_id}")
+            slots = None
+
+        if location_id not in self.states:
+            # Unsubscribed while polling
+            return
+        if slots is not None:
+            first_poll = state.slots is None
+            added, removed = diff_sorted(state.slots or [], slots)
+            self._adapt(state, len(added) + len(removed))
+            if not first_poll and len(state.slots) >= self.limit:
+                # A full window only holds the soonest slots, so booking one of them scrolls later
+                # slots into view; only slots before the old window's end can have just opened
+                added = added[:bisect_right(added, state.slots[-1])]
+            state.slots = slots
+            # The first poll only sets the baseline, nothing has "opened" yet
+            if added and not first_poll:
+                await self._notify_all(location_id, added)
+        self._reschedule(location_id, time.monotonic() + state.interval)
+
+    def _adapt(self, state: LocationState, changes: int):
+        if changes == 0:
+            state.interval = min(state.interval * self.BACKOFF, self.MAX_INTERVAL)
+        elif changes >= self.CHURN_THRESHOLD:
+            state.interval = max(state.interval / 2, self.MIN_INTERVAL)
+
+    async def _notify_all(self, location_id: int, added: list):
+        for subscriber, slots in list(self.subscriptions.matches(location_id, added)):
+            try:
+                await self.notify(subscriber, slots)
+            except Exception:
+                log.exception(f"Error notifying user {subscriber.user_id} about location {location_id}")
@@ -0,0 +1,85 @@
+import random
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of AI narrations.
+
+    Each key holds up to `variety` narrations. Until a key has that many, lookups
+    miss so a fresh variant gets generated; after that, lookups pick one of the
+    cached variants at random.
+    """
+
+    def __init__(self, max_entries: int = 500, ttl: int = 86400, variety: int = 3):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variety = variety
+        self.hits = 0
+        self.misses = 0
+        # key -> [[created_at, text], ...], least recently used first
+        self._entries: "OrderedDict[tuple, list]" = OrderedDict()
+
+    @staticmethod
+    def make_key(provider: str, model: str, action_verb: str, adjective: str, noun: str) -> tuple:
+        """Build a cache key from the normalized prompt inputs and the provider/model."""
+        return (
+            provider,
+            model,
+            action_verb.strip().lower(),
+            adjective.strip().lower(),
+            noun.strip().lower(),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _live_variants(self, key: tuple) -> list:
+        variants = self._entries.get(key)
+        if variants is None:
+            return []
+        cutoff = time.time() - self.ttl
+        variants[:] = [v for v in variants if v[0] > cutoff]
+        if not variants:
+            del self._entries[key]
+        return variants
+
+    def get(self, key: tuple) -> Optional[str]:
+        """Return a cached narration for the key, or None if a new variant should be generated."""
+        variants = self._live_variants(key)
+        if not variants or len(variants) < self.variety:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return random.choice(variants)[1]
+
+    def put(self, key: tuple, text: str):
+        """Store a narration, dropping the oldest variant and least recently used keys as needed."""
+        variants = self._live_variants(key)
+        variants.append([time.time(), text])
+        del variants[:-max(self.variety, 1)]
+        self._entries[key] = variants
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached narration and reset the counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def to_raw(self) -> list:
+        """Serialize the cache for Config."""
+        return [[list(key), variants] for key, variants in self._entries.items()]
+
+    def load_raw(self, raw: list):
+        """Load a cache serialized with to_raw, skipping expired narrations."""
+        for key, variants in raw:
+            self._entries[tuple(key)] = variants
+            self._live_variants(tuple(key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,488 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import aiohttp
+
+from .ratelimit import QueueTimeout, RateLimiter
+from .telemetry import Telemetry
+
+log = logging.getLogger("red.utility.providers")
+
+# Streaming responses can take a while to finish, but should never go quiet for long
+LLM_TIMEOUT = aiohttp.ClientTimeout(total=90, connect=5, sock_read=30)
+
+NARRATION_PROMPT = """You are a Dungeon Master narrating the outcome of a player's action in a humorous D&D-style adventure.
+
+The player chose to {action_verb} a {adjective} {noun}.
+
+Generate a creative, entertaining response (2-3 sentences) describing what happens when they perform this action. Make it funny, dramatic, or unexpected.
+
+Then, decide if this action would increase or decrease ONE of these stats: attack, charisma, or intelligence. The stat change should be between -3 to +3.
+
+Format your response EXACTLY like this:
+[Your 2-3 sentence narrative here]
+
+Stat Change: [+/-][number] [stat name]
+
+Example:
+You bravely equip the rusty spoon as a helmet. It sits awkwardly on your head, and passersby can't help but laugh at your ridiculous appearance.
+
+Stat Change: -2 Charisma"""
+
+
+SPECULATIVE_PROMPT = """You are a Dungeon Master narrating a humorous D&D-style adventure.
+
+The player found a {adjective} {noun}. They can choose to {verb} it, sell it, or equip it.
+
+For EACH of the three choices, generate a creative, entertaining response (2-3 sentences) describing what happens when they perform that action. Make it funny, dramatic, or unexpected.
+
+Then, for each choice, decide if the action would increase or decrease ONE of these stats: attack, charisma, or intelligence. The stat change should be between -3 to +3.
+
+Format your response EXACTLY like this, with all three sections in this order:
+### VERB
+[Your 2-3 sentence narrative for choosing to {verb} it]
+
+Stat Change: [+/-][number] [stat name]
+### SELL
+[Your 2-3 sentence narrative for choosing to sell it]
+
+Stat Change: [+/-][number] [stat name]
+### EQUIP
+[Your 2-3 sentence narrative for choosing to equip it]
+
+Stat Change: [+/-][number] [stat name]"""
+
+SPECULATIVE_SECTION = re.compile(r"^#+\s*(VERB|SELL|EQUIP)\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def action_verb_for(action: str, verb: str) -> str:
+    """Map a button action ('verb', 'sell' or 'equip') to the verb used in the prompt."""
+    return verb if action == "verb" else action
+
+
+def build_prompt(action: str, adjective: str, noun: str, verb: str) -> str:
+    """Build the Dungeon Master prompt for an action on a foraged item."""
+    return NARRATION_PROMPT.format(action_verb=action_verb_for(action, verb), adjective=adjective, noun=noun)
+
+
+def build_speculative_prompt(adjective: str, noun: str, verb: str) -> str:
+    """Build a single prompt asking for the outcome of all three actions at once."""
+    return SPECULATIVE_PROMPT.format(adjective=adjective, noun=noun, verb=verb)
+
+
+def parse_speculative_response(text: str) -> Optional[Dict[str, str]]:
+    """Split a response to the speculative prompt into {action: narration}, or None if a section is missing."""
+    sections = SPECULATIVE_SECTION.split(text)
+    # split() alternates [preamble, name, body, name, body, ...]
+    narrations = {
+        name.lower(): body.strip() for name, body in zip(sections[1::2], sections[2::2]) if body.strip()
+    }
+    if set(narrations) != {"verb", "sell", "equip"}:
+        return None
+    return narrations
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count for providers that don't report usage, at about 4 characters per token."""
+    return sum(len(text) for text in texts) // 4
+
+
+class ProviderError(Exception):
+    """
+    Raised when a provider can't produce a response. The message is shown to the user.
+
+    `transient` marks server errors and timeouts, which count against the
+    provider's circuit breaker; configuration problems and refusals do not.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, transient: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.transient = transient
+
+
+async def iter_sse_data(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+    """Yield the data payload of each server-sent event in a streamed response."""
+    async for raw in response.content:
+        line = raw.decode("utf-8").strip()
+        if not line.startswith("data:"):
+            # Blank separators, comments (keep-alives) and other SSE fields
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        yield data
+
+
+class LLMProvider(ABC):
+    """An LLM backend that streams a narration for a prompt."""
+
+    name = "unknown"
+    label = "Unknown"
+    # `[p]womp <key_command>` sets this provider's API key
+    key_command = ""
+    default_model = ""
+    default_base_url = ""
+
+    # Attempts for a 503 before giving up, and the pause between them
+    MAX_ATTEMPTS = 2
+    RETRY_DELAY = 1
+
+    def __init__(
+        self, session: aiohttp.ClientSession, base_url: Optional[str] = None, telemetry: Optional[Telemetry] = None
+    ):
+        self.session = session
+        self.base_url = base_url or self.default_base_url
+        self.telemetry = telemetry or Telemetry()
+
+    @abstractmethod
+    def _request(self, prompt: str, api_key: str, model: str):
+        """Start the streaming HTTP request, returning the aiohttp request context manager."""
+
+    @abstractmethod
+    def _parse_event(self, event: dict) -> str:
+        """Extract the text from one streamed event. Raise ProviderError for in-stream errors."""
+
+    def _parse_usage(self, event: dict) -> Optional[int]:
+        """Extract the total tokens used so far from one streamed event, if it reports them."""
+        return None
+
+    async def stream(
+        self, prompt: str, api_key: str, model: Optional[str] = None, usage: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response text for a prompt as it is generated.
+
+        Args:
+            prompt: The prompt to send
+            api_key: The provider's API key
+            model: The model to use, or None for the provider default
+            usage: If given, its "total_tokens" is set to the usage the provider reports
+
+        Raises:
+            ProviderError: If the request fails or nothing was generated
+        """
+        if not api_key:
+            raise ProviderError(
+                f"Error: No {self.label} API key set! Use `[p]womp {self.key_command} <your_api_key>` to set it."
+            )
+        model = model or self.default_model
+
+        for attempt in range(self.MAX_ATTEMPTS):
+            produced = False
+            start = time.perf_counter()
+            try:
+                async with self.telemetry.track(self.name) as timer, self._request(prompt, api_key, model) as response:
+                    timer.status = response.status
+                    if response.status == 503 and attempt < self.MAX_ATTEMPTS - 1:
+                        log.warning(f"{self.label} API returned 503, retrying in {self.RETRY_DELAY} second(s)...")
+                        self.telemetry.retry(self.name)
+                        await asyncio.sleep(self.RETRY_DELAY)
+                        continue
+                    if response.status == 503:
+                        break
+                    if response.status >= 400:
+                        log.error(f"{self.label} API returned {response.status}: {await response.text()}")
+                        raise ProviderError(
+                            f"Error: {self.label} API returned an error ({response.status}). Try again!",
+                            response.status,
+                            transient=response.status >= 500
+                        )
+
+                    async for data in iter_sse_data(response):
+                        try:
+                            event = json.loads(data)
+                        except json.JSONDecodeError:
+                            log.warning(f"Skipping malformed {self.label} stream event: {data!r}")
+                            continue
+                        tokens = self._parse_usage(event)
+                        if tokens is not None and usage is not None:
+                            usage["total_tokens"] = tokens
+                        text = self._parse_event(event)
+                        if text:
+                            if not produced:
+                                self.telemetry.observe(f"{self.name}.first_token", time.perf_counter() - start)
+                            produced = True
+                            yield text
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.error(f"Error calling {self.label} API: {e!r}")
+                raise ProviderError(f"Error: Could not connect to {self.label} API. {e!r}", transient=True) from e
+
+            if not produced:
+                raise ProviderError(f"Error: Could not generate a response from {self.label}.")
+            return
+
+        raise ProviderError(
+            f"Error: {self.label} API is currently unavailable (503). Please try again later.", 503, transient=True
+        )
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini, streamed with streamGenerateContent over SSE."""
+
+    name = "gemini"
+    label = "Gemini"
+    key_command = "geminiapi"
+    default_model = "gemini-3-flash-preview"
+    default_base_url = "https://generativelanguage.googleapis.com"
+
+    def _request(self, prompt: str, api_key: str, model: str):
+        url = f"{self.base_url}/v1beta/models/{model}:streamGenerateContent"
+        payload = {
+            "contents": [{
+                "parts": [{
+                    "text": prompt
+                }]
+            }]
+        }
+        return self.session.post(
+            url, params={"alt": "sse", "key": api_key}, json=payload, timeout=LLM_TIMEOUT
+        )
+
+    def _parse_event(self, event: dict) -> str:
+        candidates = event.get("candidates") or []
+        if not candidates:
+            return ""
+        candidate = candidates[0]
+        parts = candidate.get("content", {}).get("parts")
+        if not parts:
+            finish_reason = candidate.get("finishReason")
+            if finish_reason == "SAFETY":
+                raise ProviderError("The response was blocked by safety filters. Try again with a different item!")
+            if finish_reason not in (None, "STOP"):
+                log.warning(f"Gemini response missing content/parts. Finish reason: {finish_reason}")
+                raise ProviderError(
+                    f"Error: Gemini returned an incomplete response (reason: {finish_reason}). Try again!"
+                )
+            return ""
+        return "".join(part.get("text", "") for part in parts)
+
+    def _parse_usage(self, event: dict) -> Optional[int]:
+        return event.get("usageMetadata", {}).get("totalTokenCount")
+
+
+class OpenRouterProvider(LLMProvider):
+    """OpenRouter chat completions, streamed over SSE."""
+
+    name = "openrouter"
+    label = "OpenRouter"
+    key_command = "openrouterapi"
+    default_model = "z-ai/glm-4.5-air:free"
+    default_base_url = "https://openrouter.ai"
+
+    def _request(self, prompt: str, api_key: str, model: str):
+        url = f"{self.base_url}/api/v1/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {api_key}"
+        }
+        payload = {
+            "model": model,
+            "stream": True,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+        return self.session.post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT)
+
+    def _parse_event(self, event: dict) -> str:
+        if "error" in event:
+            error = event["error"]
+            log.error(f"OpenRouter stream error: {error}")
+            raise ProviderError(
+                "Error: OpenRouter returned an incomplete response. Try again!",
+                error.get("code") if isinstance(error, dict) and isinstance(error.get("code"), int) else None
+            )
+        choices = event.get("choices") or []
+        if not choices:
+            return ""
+        return choices[0].get("delta", {}).get("content") or ""
+
+    def _parse_usage(self, event: dict) -> Optional[int]:
+        return (event.get("usage") or {}).get("total_tokens")
+
+
+class Route(NamedTuple):
+    """A provider along with the credentials and model to call it with."""
+
+    provider: LLMProvider
+    api_key: Optional[str]
+    model: str
+
+
+class CircuitBreaker:
+    """Stops routing to a provider after consecutive server errors or timeouts, until a cooldown passes."""
+
+    def __init__(self, threshold: int = 3, cooldown: float = 60):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether requests should skip this provider. After the cooldown one trial request is let through."""
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.cooldown
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class ProviderRouter:
+    """
+    Routes a prompt across providers.
+
+    The first route is the primary. If it hasn't produced any text within
+    `hedge_delay` seconds, the next route is started as a hedge and whichever
+    answers first wins; the other request is cancelled. If the primary fails
+    before answering, the next route is tried straight away. Routes whose
+    circuit breaker is open are skipped.
+
+    Every request needs a token from its (provider, model) rate limiter. The
+    primary waits in line for one; hedges and failovers are only sent when a
+    token is free right away.
+    """
+
+    def __init__(self, hedge_delay: float = 3.0, breaker_threshold: int = 3, breaker_cooldown: float = 60):
+        self.hedge_delay = hedge_delay
+        self.limiter = RateLimiter()
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(self.breaker_threshold, self.breaker_cooldown)
+        return self.breakers[name]
+
+    def available(self, routes: List[Route]) -> List[Route]:
+        """The routes a request would be sent to, primary first: those with a key and a closed breaker."""
+        configured = [route for route in routes if route.api_key]
+        if not configured:
+            # Let the primary explain which key is missing
+            configured = routes[:1]
+        return [route for route in configured if not self.breaker(route.provider.name).is_open]
+
+    def _record_error(self, route: Route, error: ProviderError):
+        if error.transient:
+            self.breaker(route.provider.name).record_failure()
+
+    async def stream(
+        self,
+        prompt: str,
+        routes: List[Route],
+        priority: int = 1,
+        on_position: Callable[[int], Awaitable] = None,
+        usage: Optional[dict] = None
+    ) -> AsyncIterator[Tuple[Route, str]]:
+        """
+        Stream the response for a prompt, yielding (route, text) for each chunk.
+
+        Args:
+            prompt: The prompt to send
+            routes: Candidate routes, primary first
+            priority: Place in the rate limit line, lower goes first
+            on_position: Awaited with the caller's place in line if it has to wait
+            usage: If given, filled in with the token usage the provider reports
+
+        Raises:
+            ProviderError: If no route could produce a response
+        """
+        available = self.available(routes)
+        if not available:
+            raise ProviderError("Error: The AI providers are having trouble right now. Please try again later.")
+
+        pending_routes = list(available)
+        attempts = {}  # first-chunk task -> (route, stream)
+
+        def start(route: Route):
+            stream = route.provider.stream(prompt, route.api_key, route.model, usage).__aiter__()
+            attempts[asyncio.ensure_future(stream.__anext__())] = (route, stream)
+
+        def launch() -> bool:
+            # Backup routes are only worth it if they can go out right away
+            while pending_routes:
+                route = pending_routes.pop(0)
+                if self.limiter.queue(route.provider.name, route.model).try_acquire():
+                    start(route)
+                    return True
+            return False
+
+        primary = pending_routes.pop(0)
+        try:
+            await self.limiter.queue(primary.provider.name, primary.model).acquire(priority, on_position)
+        except QueueTimeout:
+            raise ProviderError("Womp is swamped with requests right now! Try again in a minute.") from None
+        start(primary)
+        hedge_deadline = time.monotonic() + self.hedge_delay
+        winner = None
+        hedged = False
+        errors = []
+        try:
+            while attempts and winner is None:
+                timeout = None
+                if pending_routes and self.hedge_delay > 0:
+                    timeout = max(hedge_deadline - time.monotonic(), 0)
+                done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if launch():
+                        log.info(f"No response within {self.hedge_delay}s, hedging to another provider")
+                        self.hedges += 1
+                        hedged = True
+                    continue
+                for task in done:
+                    route, stream = attempts.pop(task)
+                    try:
+                        first = task.result()
+                    except StopAsyncIteration:
+                        errors.append(ProviderError(f"Error: Could not generate a response from {route.provider.label}."))
+                    except ProviderError as e:
+                        self._record_error(route, e)
+                        errors.append(e)
+                    else:
+                        winner = (route, stream, first)
+                        break
+                if winner is None and not attempts and launch():
+                    log.info("Primary provider failed, failing over to another provider")
+                    self.failovers += 1
+        finally:
+            for task, (route, stream) in attempts.items():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, StopAsyncIteration, ProviderError):
+                    pass
+                await stream.aclose()
+
+        if winner is None:
+            raise errors[0]
+
+        route, stream, first = winner
+        if hedged and route is not available[0]:
+            self.hedge_wins += 1
+        try:
+            yield route, first
+            async for chunk in stream:
+                yield route, chunk
+        except ProviderError as e:
+            self._record_error(route, e)
+            raise
+        finally:
+            await stream.aclose()
+        self.breaker(route.provider.name).record_success()
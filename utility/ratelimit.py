@@ -0,0 +1,137 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class QueueTimeout(Exception):
+    """Raised when a request would wait in line longer than the queue allows."""
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        """Take a token if one is available."""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """Seconds until the next token is available."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionQueue:
+    """
+    Priority line in front of a token bucket.
+
+    Requests that can't get a token right away wait in line, lower priority
+    numbers first and then in arrival order. A background pump hands out tokens
+    as the bucket refills. Requests that would wait longer than `max_wait` are
+    turned away.
+    """
+
+    def __init__(self, bucket: TokenBucket, max_wait: float):
+        self.bucket = bucket
+        self.max_wait = max_wait
+        # heap of (priority, arrival, future)
+        self._waiters = []
+        self._arrivals = itertools.count()
+        self._pump_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def try_acquire(self) -> bool:
+        """Take a token without waiting, unless someone is already in line."""
+        return not len(self) and self.bucket.try_take()
+
+    async def acquire(self, priority: int = 1, on_position: Callable[[int], Awaitable] = None):
+        """
+        Wait for a token.
+
+        Args:
+            priority: Lower goes first; 0 is reserved for the bot owner
+            on_position: Awaited with the caller's place in line if it has to wait
+
+        Raises:
+            QueueTimeout: If the wait would be longer than max_wait
+        """
+        if self.try_acquire():
+            return
+
+        ahead = sum(1 for p, _, future in self._waiters if p <= priority and not future.done())
+        estimate = self.bucket.wait_time() + ahead / self.bucket.rate
+        if estimate > self.max_wait:
+            raise QueueTimeout(estimate)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+
+        if on_position is not None:
+            await on_position(ahead + 1)
+        try:
+            await asyncio.wait_for(future, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            raise QueueTimeout(self.max_wait) from None
+
+    async def _pump(self):
+        while True:
+            # Drop requests that gave up waiting
+            while self._waiters and self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+            if not self._waiters:
+                return
+            delay = self.bucket.wait_time()
+            if delay:
+                await asyncio.sleep(delay)
+            elif self.bucket.try_take():
+                future = heapq.heappop(self._waiters)[2]
+                if not future.done():
+                    future.set_result(None)
+
+
+class RateLimiter:
+    """One admission queue per (provider, model), all sharing the same limits."""
+
+    def __init__(self, per_minute: float = 10, burst: int = 3, max_wait: float = 30):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.max_wait = max_wait
+        self.queues: Dict[tuple, AdmissionQueue] = {}
+
+    def queue(self, provider: str, model: str) -> AdmissionQueue:
+        key = (provider, model)
+        if key not in self.queues:
+            self.queues[key] = AdmissionQueue(TokenBucket(self.per_minute / 60, self.burst), self.max_wait)
+        return self.queues[key]
+
+    def configure(self, per_minute: float, burst: int, max_wait: float):
+        """Change the limits, applying them to existing queues too."""
+        self.per_minute = per_minute
+        self.burst = burst
+        self.max_wait = max_wait
+        for queue in self.queues.values():
+            queue.bucket.rate = per_minute / 60
+            queue.bucket.capacity = burst
+            queue.max_wait = max_wait
@@ -0,0 +1,150 @@
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Significant bits kept per latency bucket, for roughly 3% relative error
+SIGNIFICANT_BITS = 5
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram.
+
+    Latencies are recorded in microseconds into log-linear buckets that keep
+    only the top SIGNIFICANT_BITS bits of the value, so memory stays small
+    while percentiles stay within a few percent at any scale.
+    """
+
+    def __init__(self):
+        # bucket lower bound (us) -> count
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _bucket(micros: int) -> int:
+        shift = max(micros.bit_length() - SIGNIFICANT_BITS, 0)
+        return (micros >> shift) << shift
+
+    def record(self, seconds: float):
+        micros = max(int(seconds * 1_000_000), 1)
+        bucket = self._bucket(micros)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, pct: float) -> float:
+        """Latency in seconds at the given percentile (0-100), or 0 if nothing was recorded."""
+        if not self.count:
+            return 0.0
+        target = self.count * pct / 100
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                width = 1 << max(bucket.bit_length() - SIGNIFICANT_BITS, 0)
+                return min((bucket + width / 2) / 1_000_000, self.max)
+        return self.max
+
+
+class EndpointStats:
+    """Latency, status codes and retries for one outbound endpoint."""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        # HTTP status code, or "error" for requests that never got a response
+        self.statuses: Counter = Counter()
+        self.retries = 0
+
+    @property
+    def errors(self) -> int:
+        return sum(n for status, n in self.statuses.items() if status == "error" or status >= 400)
+
+
+class RequestTimer:
+    """Times one request. Usable as a sync or async context manager; set `status` once the response arrives."""
+
+    def __init__(self, stats: EndpointStats):
+        self.stats = stats
+        self.status: Optional[int] = None
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Requests abandoned on purpose (hedge losers, closed streams) say nothing about the endpoint
+        if exc_type is not None and issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            return False
+        self.stats.latency.record(time.perf_counter() - self._start)
+        self.stats.statuses[self.status if self.status is not None else "error"] += 1
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+class Telemetry:
+    """
+    Registry of outbound HTTP statistics per endpoint.
+
+    Owned by the Utility cog; other cogs can report into it through
+    `bot.get_cog("Utility").telemetry` when it is loaded.
+    """
+
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def endpoint(self, name: str) -> EndpointStats:
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointStats()
+        return self.endpoints[name]
+
+    def track(self, name: str) -> RequestTimer:
+        """Time a request to the endpoint."""
+        return RequestTimer(self.endpoint(name))
+
+    def observe(self, name: str, seconds: float):
+        """Record a latency measured elsewhere, such as time to first token."""
+        self.endpoint(name).latency.record(seconds)
+
+    def retry(self, name: str):
+        """Count a retried request to the endpoint."""
+        self.endpoint(name).retries += 1
+
+    def reset(self):
+        self.endpoints.clear()
+
+    def render_prometheus(self, prefix: str = "hatchcogs_http") -> str:
+        """Render every endpoint in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_request_duration_seconds Outbound request latency.",
+            f"# TYPE {prefix}_request_duration_seconds summary",
+        ]
+        for name, stats in sorted(self.endpoints.items()):
+            for quantile in (0.5, 0.95, 0.99):
+                lines.append(
+                    f'{prefix}_request_duration_seconds{{endpoint="{name}",quantile="{quantile}"}} '
+                    f"{stats.latency.percentile(quantile * 100):.6f}"
+                )
+            lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{name}"}} {stats.latency.total:.6f}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{name}"}} {stats.latency.count}')
+
+        lines.append(f"# HELP {prefix}_responses_total Outbound responses by status code.")
+        lines.append(f"# TYPE {prefix}_responses_total counter")
+        for name, stats in sorted(self.endpoints.items()):
+            for status, count in sorted(stats.statuses.items(), key=lambda item: str(item[0])):
+                lines.append(f'{prefix}_responses_total{{endpoint="{name}",status="{status}"}} {count}')
+
+        lines.append(f"# HELP {prefix}_retries_total Outbound requests that were retried.")
+        lines.append(f"# TYPE {prefix}_retries_total counter")
+        for name, stats in sorted(self.endpoints.items()):
+            lines.append(f'{prefix}_retries_total{{endpoint="{name}"}} {stats.retries}')
+        return "\n".join(lines) + "\n"
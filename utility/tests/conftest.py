@@ -0,0 +1,107 @@
+import asyncio
+import functools
+import json
+import re
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from redbot.core import Config
+from redbot.core._drivers import JsonDriver
+
+from utility.providers import GeminiProvider, OpenRouterProvider
+from utility.utility import Utility
+
+NARRATION = "You polish the spoon until it gleams.\n\nStat Change: +1 Charisma"
+
+
+def run_async(test):
+    """Run a coroutine test function in its own event loop, so no asyncio pytest plugin is needed."""
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        return asyncio.run(test(*args, **kwargs))
+    return wrapper
+
+
+@pytest.fixture()
+def cog(tmp_path, monkeypatch):
+    driver = JsonDriver("Utility", uuid.uuid4().hex, data_path_override=tmp_path)
+    config = Config("Utility", driver.unique_cog_identifier, driver, force_registration=True)
+    monkeypatch.setattr(Config, "get_conf", lambda *args, **kwargs: config)
+    return Utility(None)
+
+
+@asynccontextmanager
+async def loaded(cog: Utility) -> AsyncIterator[Utility]:
+    """Load the cog for the duration of the block."""
+    await cog.cog_load()
+    try:
+        yield cog
+    finally:
+        await cog.cog_unload()
+
+
+class StubLLM:
+    """
+    A local server speaking both providers' streaming APIs.
+
+    Each response waits `latency` seconds before its first event and fails with
+    `status` when that is set. Both can be changed between requests.
+    """
+
+    def __init__(self, text: str = NARRATION, latency: float = 0.0, status: int = None):
+        self.text = text
+        self.latency = latency
+        self.status = status
+        self.requests = 0
+        self.server = None
+
+    async def _respond(self, request: web.Request, events: list) -> web.StreamResponse:
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if self.status is not None:
+            return web.Response(status=self.status, text="stub failure")
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for event in events:
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    def _chunks(self) -> list:
+        # A word at a time, with the whitespace after it
+        return re.findall(r"\S+\s*", self.text)
+
+    async def gemini(self, request: web.Request) -> web.StreamResponse:
+        return await self._respond(request, [
+            {"candidates": [{"content": {"parts": [{"text": chunk}]}}]} for chunk in self._chunks()
+        ])
+
+    async def openrouter(self, request: web.Request) -> web.StreamResponse:
+        return await self._respond(request, [{"choices": [{"delta": {"content": chunk}}]} for chunk in self._chunks()])
+
+    @property
+    def base_url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+    async def __aenter__(self) -> "StubLLM":
+        app = web.Application()
+        app.router.add_post("/v1beta/models/{model}:streamGenerateContent", self.gemini)
+        app.router.add_post("/api/v1/chat/completions", self.openrouter)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.server.close()
+
+
+def point_at(cog: Utility, gemini: StubLLM, openrouter: StubLLM):
+    """Send the loaded cog's provider requests to the stub servers."""
+    cog.providers = {
+        "gemini": GeminiProvider(cog.session, base_url=gemini.base_url, telemetry=cog.telemetry),
+        "openrouter": OpenRouterProvider(cog.session, base_url=openrouter.base_url, telemetry=cog.telemetry),
+    }
@@ -0,0 +1,39 @@
+from .conftest import StubLLM, loaded, point_at, run_async
+
+
+async def narrate(cog):
+    return "".join([chunk async for chunk in cog.stream_ai_response("sell", "shiny", "spoon", "polish")])
+
+
+@run_async
+async def test_cached_under_the_route_that_answered_without_a_primary_key(cog):
+    await cog.config.openrouter_api_key.set("key")
+    async with loaded(cog), StubLLM() as gemini, StubLLM() as openrouter:
+        point_at(cog, gemini, openrouter)
+        cog.response_cache.variety = 1
+
+        first = await narrate(cog)
+        second = await narrate(cog)
+
+    # Gemini is the primary but has no key, so OpenRouter answered and the second narration is its cached one
+    assert first == second
+    assert (gemini.requests, openrouter.requests) == (0, 1)
+    assert cog.response_cache.hits == 1
+
+
+@run_async
+async def test_cached_under_the_route_that_answered_with_the_primary_breaker_open(cog):
+    await cog.config.gemini_api_key.set("key")
+    await cog.config.openrouter_api_key.set("key")
+    async with loaded(cog), StubLLM() as gemini, StubLLM() as openrouter:
+        point_at(cog, gemini, openrouter)
+        cog.response_cache.variety = 1
+        breaker = cog.router.breaker("gemini")
+        for _ in range(breaker.threshold):
+            breaker.record_failure()
+
+        await narrate(cog)
+        await narrate(cog)
+
+    assert (gemini.requests, openrouter.requests) == (0, 1)
+    assert cog.response_cache.hits == 1
@@ -0,0 +1,70 @@
+import asyncio
+import gc
+import random
+import statistics
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+pytest.importorskip("pytest_benchmark")
+
+from utility import utility
+from utility.utility import WordsAPISource
+
+from .conftest import loaded
+
+FORAGES = 50
+# Round-trip time of one Words API request
+LATENCY = 0.05
+# How often the ticker checks in on the event loop
+TICK = 0.005
+WORDS = ["spoon", "lantern", "gleaming", "rusty", "juggle", "polish", "barrel", "sneeze"]
+
+
+async def stub_words_api(request):
+    await asyncio.sleep(LATENCY)
+    return web.json_response({"word": random.choice(WORDS)})
+
+
+async def ticker(lags: list):
+    """Record how late each tick wakes up, which is how long something else held the event loop."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+def test_event_loop_stays_responsive_during_50_forages(benchmark, cog, monkeypatch):
+    lags = []
+
+    async def forage():
+        app = web.Application()
+        app.router.add_get("/words", stub_words_api)
+        async with TestServer(app) as server, loaded(cog):
+            monkeypatch.setattr(utility, "WORDS_API_URL", str(server.make_url("/words")))
+            await cog.config.api_key.set("key")
+            # Every word from a live lookup, skipping the pool and the lexicon, and no refills alongside
+            await cog.word_pool.stop()
+            cog.word_sources = [WordsAPISource(cog)]
+            # Open the first connections before measuring, so one-off setup isn't counted as lag
+            await cog.generate_womp_phrase()
+
+            tick = asyncio.create_task(ticker(lags))
+            results = await asyncio.gather(*(cog.generate_womp_phrase() for _ in range(FORAGES)))
+            tick.cancel()
+        assert all(not isinstance(result, str) for result in results)
+
+    # Keep full collections of everything imported so far out of the measured pauses
+    gc.collect()
+    gc.freeze()
+    try:
+        benchmark.pedantic(lambda: asyncio.run(forage()), rounds=3, iterations=1)
+    finally:
+        gc.unfreeze()
+    # The ticker kept running throughout, where blocking requests would stall nearly every tick for a round-trip.
+    # The percentile leaves out the one busy tick per round where all the lookups start at once.
+    assert len(lags) > 100
+    assert statistics.median(lags) < TICK
+    assert statistics.quantiles(lags, n=20)[-1] < LATENCY / 2
@@ -0,0 +1,155 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+from utility.providers import GeminiProvider, OpenRouterProvider, ProviderError, ProviderRouter, Route
+
+from .conftest import NARRATION, StubLLM, run_async
+
+HEDGE_DELAY = 0.1
+# Slow enough that a hedge sent after HEDGE_DELAY clearly finishes first
+SLOW = 1.0
+
+
+def make_router(**kwargs) -> ProviderRouter:
+    router = ProviderRouter(hedge_delay=HEDGE_DELAY, **kwargs)
+    # Plenty of tokens, so only the routing is under test
+    router.limiter.configure(6000, 100, 5)
+    return router
+
+
+def make_routes(session, primary: StubLLM, backup: StubLLM) -> list:
+    return [
+        Route(GeminiProvider(session, base_url=primary.base_url), "key", "stub-model"),
+        Route(OpenRouterProvider(session, base_url=backup.base_url), "key", "stub-model"),
+    ]
+
+
+async def narrate(router: ProviderRouter, routes: list) -> tuple:
+    """The full narration and the name of the provider that produced it."""
+    chunks = []
+    async for route, chunk in router.stream("prompt", routes):
+        chunks.append(chunk)
+    return "".join(chunks), route.provider.name
+
+
+@run_async
+async def test_fast_primary_is_not_hedged():
+    router = make_router()
+    async with StubLLM() as primary, StubLLM() as backup, aiohttp.ClientSession() as session:
+        text, name = await narrate(router, make_routes(session, primary, backup))
+
+    assert (text, name) == (NARRATION, "gemini")
+    assert (primary.requests, backup.requests) == (1, 0)
+    assert router.hedges == 0
+
+
+@run_async
+async def test_slow_primary_is_hedged_and_the_backup_wins():
+    router = make_router()
+    async with StubLLM(latency=SLOW) as primary, StubLLM() as backup, aiohttp.ClientSession() as session:
+        start = time.perf_counter()
+        text, name = await narrate(router, make_routes(session, primary, backup))
+        elapsed = time.perf_counter() - start
+
+    assert (text, name) == (NARRATION, "openrouter")
+    assert (primary.requests, backup.requests) == (1, 1)
+    assert (router.hedges, router.hedge_wins) == (1, 1)
+    # Answered by the hedge, without waiting on the primary
+    assert elapsed < SLOW / 2
+
+
+@run_async
+async def test_primary_answering_first_wins_the_hedge():
+    router = make_router()
+    async with StubLLM(latency=HEDGE_DELAY * 2) as primary, StubLLM(latency=SLOW) as backup, \
+            aiohttp.ClientSession() as session:
+        start = time.perf_counter()
+        text, name = await narrate(router, make_routes(session, primary, backup))
+        elapsed = time.perf_counter() - start
+
+    assert name == "gemini"
+    assert (router.hedges, router.hedge_wins) == (1, 0)
+    # The losing hedge was cancelled rather than waited on
+    assert elapsed < SLOW / 2
+
+
+@run_async
+async def test_failed_primary_fails_over():
+    router = make_router()
+    async with StubLLM(status=500) as primary, StubLLM() as backup, aiohttp.ClientSession() as session:
+        start = time.perf_counter()
+        text, name = await narrate(router, make_routes(session, primary, backup))
+        elapsed = time.perf_counter() - start
+
+    assert (text, name) == (NARRATION, "openrouter")
+    assert router.failovers == 1
+    assert router.hedges == 0
+    # Failed over straight away instead of waiting for the hedge delay
+    assert elapsed < HEDGE_DELAY
+    assert router.breaker("gemini").failures == 1
+
+
+@run_async
+async def test_every_route_failing_raises_the_primary_error():
+    router = make_router()
+    async with StubLLM(status=500) as primary, StubLLM(status=502) as backup, aiohttp.ClientSession() as session:
+        with pytest.raises(ProviderError) as raised:
+            await narrate(router, make_routes(session, primary, backup))
+
+    assert raised.value.status == 500
+    assert (primary.requests, backup.requests) == (1, 1)
+
+
+@run_async
+async def test_breaker_trips_after_repeated_server_errors_and_recovers():
+    router = make_router(breaker_threshold=3, breaker_cooldown=0.2)
+    async with StubLLM(status=500) as primary, StubLLM() as backup, aiohttp.ClientSession() as session:
+        routes = make_routes(session, primary, backup)
+        for _ in range(3):
+            await narrate(router, routes)
+        assert router.breaker("gemini").is_open
+        assert primary.requests == 3
+
+        # Skipped while the breaker is open
+        _, name = await narrate(router, routes)
+        assert name == "openrouter"
+        assert primary.requests == 3
+        assert router.failovers == 3
+
+        # After the cooldown one trial request goes through, and its success closes the breaker
+        primary.status = None
+        await asyncio.sleep(0.2)
+        _, name = await narrate(router, routes)
+        assert name == "gemini"
+        assert primary.requests == 4
+        assert not router.breaker("gemini").is_open
+        assert router.breaker("gemini").failures == 0
+
+
+@run_async
+async def test_client_errors_do_not_trip_the_breaker():
+    router = make_router(breaker_threshold=3)
+    async with StubLLM(status=400) as primary, StubLLM() as backup, aiohttp.ClientSession() as session:
+        routes = make_routes(session, primary, backup)
+        for _ in range(5):
+            _, name = await narrate(router, routes)
+            assert name == "openrouter"
+
+    assert primary.requests == 5
+    assert not router.breaker("gemini").is_open
+
+
+@run_async
+async def test_every_breaker_open_raises_without_a_request():
+    router = make_router(breaker_threshold=1)
+    async with StubLLM(status=500) as primary, StubLLM(status=500) as backup, aiohttp.ClientSession() as session:
+        routes = make_routes(session, primary, backup)
+        with pytest.raises(ProviderError):
+            await narrate(router, routes)
+        with pytest.raises(ProviderError, match="having trouble"):
+            await narrate(router, routes)
+
+    assert (primary.requests, backup.requests) == (1, 1)
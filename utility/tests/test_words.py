@@ -0,0 +1,24 @@
+from .conftest import loaded, run_async
+
+
+class Context:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+
+@run_async
+async def test_pool_shows_the_last_forage_lookup_times(cog):
+    async with loaded(cog):
+        ctx = Context()
+        await cog.womp_pool.callback(cog, ctx)
+        assert "Last forage lookups: no forages yet" in ctx.sent[-1]
+
+        words = await cog.get_random_words("adjective", "noun", "verb")
+        assert set(words) == set(cog.word_timings) == {"adjective", "noun", "verb"}
+
+        await cog.womp_pool.callback(cog, ctx)
+        timings = ctx.sent[-1].split("Last forage lookups: ")[1]
+        assert sorted(part.split()[0] for part in timings.split(", ")) == ["adjective", "noun", "verb"]
@@ -1,15 +1,252 @@
 import re
 
+import aiohttp
 import discord
 from redbot.core import commands, app_commands, Config
 from redbot.core.bot import Red
+from redbot.core.utils.chat_formatting import box
 from copy import copy
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
 import logging
-import requests
 import asyncio
+import time
+import json
+import random
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from pathlib import Path
+
+from .cache import ResponseCache
+from .telemetry import Telemetry
+from .providers import (
+    GeminiProvider,
+    OpenRouterProvider,
+    ProviderError,
+    ProviderRouter,
+    Route,
+    action_verb_for,
+    build_prompt,
+    build_speculative_prompt,
+    estimate_tokens,
+    parse_speculative_response,
+)
 
 log = logging.getLogger("red.utility")
 
+WORDS_API_URL = "https://wordsapiv1.p.rapidapi.com/words"
+WORDS_API_HOST = "wordsapiv1.p.rapidapi.com"
+
+# Default timeout for every request made through the cog's session
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=5)
+# Words API lookups are tiny, so fail fast instead of holding up a forage
+WORDS_API_TIMEOUT = aiohttp.ClientTimeout(total=5, connect=3)
+# Minimum seconds between edits while streaming a narration into a message
+STREAM_EDIT_INTERVAL = 1.0
+# Seconds between writes of the Prometheus metrics file
+METRICS_EXPORT_INTERVAL = 60
+# Rate limit priority of speculative narrations, behind everyone actually waiting on a button
+SPECULATIVE_PRIORITY = 2
+
+PARTS_OF_SPEECH = ("adjective", "noun", "verb")
+
+
+def is_valid_word(word: Optional[str]) -> bool:
+    """Check a word against the forage filters: 3-10 letters and no spaces."""
+    return bool(word) and 3 <= len(word) <= 10 and ' ' not in word
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Per part-of-speech lookup times, slowest first."""
+    return ", ".join(
+        f"{pos} {elapsed * 1000:.0f}ms" for pos, elapsed in sorted(timings.items(), key=lambda t: t[1], reverse=True)
+    )
+
+
+class WordSource(ABC):
+    """A source of random words for Womp's forages."""
+
+    name = "unknown"
+
+    @abstractmethod
+    async def get_word(self, part_of_speech: str) -> Optional[str]:
+        """Return a random word for the part of speech, or None if this source has none."""
+
+
+class LexiconWordSource(WordSource):
+    """
+    Bundled offline lexicon, so forages keep working without the Words API.
+
+    Each part of speech is packed into a single bytes blob sorted by word
+    length, with an offset array into the blob and the index of the first
+    word of every length. Picking a random word in a length range is then
+    one randrange and one slice.
+    """
+
+    name = "lexicon"
+
+    def __init__(self, path: Path):
+        with open(path) as f:
+            lexicon = json.load(f)
+        # pos -> (blob, offsets, length_starts)
+        self._packed = {pos: self._pack(words) for pos, words in lexicon.items()}
+
+    @staticmethod
+    def _pack(words: list) -> tuple:
+        words = sorted({w for w in words if is_valid_word(w)}, key=lambda w: (len(w), w))
+        blob = "".join(words).encode()
+        offsets = array("I", [0])
+        for word in words:
+            offsets.append(offsets[-1] + len(word.encode()))
+        # length_starts[n] is the index of the first word longer than n - 1 letters
+        longest = len(words[-1]) if words else 0
+        length_starts = array("I", [0] * (longest + 2))
+        index = 0
+        for length in range(longest + 2):
+            while index < len(words) and len(words[index]) < length:
+                index += 1
+            length_starts[length] = index
+        return blob, offsets, length_starts
+
+    def sample(self, part_of_speech: str, min_len: int = 3, max_len: int = 10) -> Optional[str]:
+        """Pick a random word with a length between min_len and max_len, in constant time."""
+        packed = self._packed.get(part_of_speech)
+        if packed is None:
+            return None
+        blob, offsets, length_starts = packed
+        last = len(length_starts) - 1
+        start = length_starts[min(max(min_len, 0), last)]
+        end = length_starts[min(max(max_len + 1, 0), last)]
+        if start >= end:
+            return None
+        index = random.randrange(start, end)
+        return blob[offsets[index]:offsets[index + 1]].decode()
+
+    def __len__(self) -> int:
+        return sum(len(offsets) - 1 for _, offsets, _ in self._packed.values())
+
+    async def get_word(self, part_of_speech: str) -> Optional[str]:
+        return self.sample(part_of_speech)
+
+
+class WordsAPISource(WordSource):
+    """Live Words API lookups. Sits out for a while after a failure so forages fall through quickly."""
+
+    name = "wordsapi"
+
+    # Seconds to skip the API after a failed lookup
+    COOLDOWN = 60
+
+    def __init__(self, cog):
+        self.cog = cog
+        self._down_until = 0.0
+
+    async def get_word(self, part_of_speech: str) -> Optional[str]:
+        if time.monotonic() < self._down_until:
+            return None
+        word = await self.cog.fetch_random_word(part_of_speech)
+        if word is None and await self.cog.config.api_key():
+            self._down_until = time.monotonic() + self.COOLDOWN
+        return word
+
+
+class WordPool(WordSource):
+    """
+    In-memory reservoir of random words per part of speech.
+
+    A background task tops each part of speech back up in batches whenever it
+    drops below the low-water mark, so forages can pop a word without waiting
+    on the Words API. The pool is persisted to Config between restarts.
+    """
+
+    # Concurrent Words API requests while refilling
+    REFILL_CONCURRENCY = 5
+    # Wait before retrying after a refill that produced no words
+    REFILL_BACKOFF = 30
+
+    name = "pool"
+
+    def __init__(self, cog):
+        self.cog = cog
+        self.words: Dict[str, deque] = {pos: deque() for pos in PARTS_OF_SPEECH}
+        self.low_water = 10
+        self.batch_size = 20
+        self._wanted = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def pop(self, part_of_speech: str) -> Optional[str]:
+        """Take a word from the pool, or None if it is empty. Triggers a refill when running low."""
+        words = self.words.get(part_of_speech)
+        if words is None:
+            return None
+        word = words.popleft() if words else None
+        if len(words) < self.low_water:
+            self._wanted.set()
+        return word
+
+    async def get_word(self, part_of_speech: str) -> Optional[str]:
+        return self.pop(part_of_speech)
+
+    def wake(self):
+        """Ask the refill task to check the pool levels."""
+        self._wanted.set()
+
+    def sizes(self) -> Dict[str, int]:
+        """Number of pooled words per part of speech."""
+        return {pos: len(words) for pos, words in self.words.items()}
+
+    async def start(self):
+        """Load the persisted pool and start the background refill task."""
+        config = self.cog.config
+        self.low_water = await config.pool_low_water()
+        self.batch_size = await config.pool_batch_size()
+        stored = await config.word_pool()
+        for pos in PARTS_OF_SPEECH:
+            self.words[pos].extend(w for w in stored.get(pos, []) if is_valid_word(w))
+        self.wake()
+        self._task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self):
+        """Stop the refill task and persist what is left in the pool."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.save()
+
+    async def save(self):
+        """Persist the pool to Config."""
+        await self.cog.config.word_pool.set({pos: list(words) for pos, words in self.words.items()})
+
+    async def _refill_loop(self):
+        while True:
+            await self._wanted.wait()
+            self._wanted.clear()
+            added = 0
+            try:
+                for pos, words in self.words.items():
+                    while len(words) < self.low_water:
+                        batch = await self._fetch_batch(pos)
+                        if not batch:
+                            break
+                        words.extend(batch)
+                        added += len(batch)
+            except Exception:
+                log.exception("Error refilling the word pool")
+            if added:
+                await self.save()
+            elif any(len(words) < self.low_water for words in self.words.values()):
+                await asyncio.sleep(self.REFILL_BACKOFF)
+
+    async def _fetch_batch(self, part_of_speech: str) -> list:
+        semaphore = asyncio.Semaphore(self.REFILL_CONCURRENCY)
+
+        async def fetch():
+            async with semaphore:
+                return await self.cog.fetch_random_word(part_of_speech)
+
+        words = await asyncio.gather(*(fetch() for _ in range(self.batch_size)))
+        return [word for word in words if is_valid_word(word)]
+
 
 class Utility(commands.Cog):
     """
@@ -24,19 +261,93 @@ class Utility(commands.Cog):
             "gemini_api_key": None,
             "openrouter_api_key": None,
             "use_openrouter": False,
-            "openrouter_model": "z-ai/glm-4.5-air:free"
+            "openrouter_model": "z-ai/glm-4.5-air:free",
+            "word_pool": {},
+            "pool_low_water": 10,
+            "pool_batch_size": 20,
+            "cache_size": 500,
+            "cache_ttl": 86400,
+            "cache_variety": 3,
+            "cache_persist": False,
+            "response_cache": [],
+            "hedge_delay": 3.0,
+            "rate_per_minute": 10,
+            "rate_burst": 3,
+            "queue_max_wait": 30,
+            "speculative": False,
+            "metrics_file": None
         }
         self.config.register_global(**default_global)
+        self.session: Optional[aiohttp.ClientSession] = None
+        # Shared outbound HTTP statistics; other cogs report here through bot.get_cog("Utility")
+        self.telemetry = Telemetry()
+        self._metrics_task: Optional[asyncio.Task] = None
+        self.providers = {}
+        self.response_cache = ResponseCache()
+        self.router = ProviderRouter()
+        self.speculative_stats = {"requests": 0, "failed": 0, "tokens": 0, "narrations": 0, "used": 0}
+        self.word_pool = WordPool(self)
+        self.lexicon = LexiconWordSource(Path(__file__).parent / "lexicon.json")
+        # Tried in order until one returns a word; the API only enriches the bundled lexicon
+        self.word_sources = [self.word_pool, WordsAPISource(self), self.lexicon]
+        # Per part-of-speech lookup time (seconds) of the most recent forage
+        self.word_timings: Dict[str, float] = {}
 
     async def cog_load(self):
         """Called when the cog is loaded"""
+        # One pooled session for the lifetime of the cog so connections are kept alive
+        connector = aiohttp.TCPConnector(limit=20, limit_per_host=10, keepalive_timeout=30)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=HTTP_TIMEOUT)
+        self.providers = {
+            provider.name: provider for provider in (
+                GeminiProvider(self.session, telemetry=self.telemetry),
+                OpenRouterProvider(self.session, telemetry=self.telemetry)
+            )
+        }
+        await self.word_pool.start()
+        self.response_cache.max_entries = await self.config.cache_size()
+        self.response_cache.ttl = await self.config.cache_ttl()
+        self.response_cache.variety = await self.config.cache_variety()
+        self.router.hedge_delay = await self.config.hedge_delay()
+        self.router.limiter.configure(
+            await self.config.rate_per_minute(), await self.config.rate_burst(), await self.config.queue_max_wait()
+        )
+        if await self.config.cache_persist():
+            self.response_cache.load_raw(await self.config.response_cache())
+        self._metrics_task = asyncio.create_task(self._export_metrics_loop())
         log.info("Utility cog loaded")
 
     async def cog_unload(self):
         """Called when the cog is unloaded"""
+        await self.word_pool.stop()
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+        if await self.config.cache_persist():
+            await self.config.response_cache.set(self.response_cache.to_raw())
+        if self.session is not None:
+            await self.session.close()
         log.info("Utility cog unloaded")
 
     async def get_random_word(self, part_of_speech: str) -> str:
+        """
+        Get a random word of the specified part of speech.
+
+        Each word source is tried in order: the pre-fetched pool, a live Words
+        API lookup, then the bundled offline lexicon.
+
+        Args:
+            part_of_speech: 'adjective', 'noun', or 'verb'
+
+        Returns:
+            A random word string, or None if no source had a word
+        """
+        for source in self.word_sources:
+            word = await source.get_word(part_of_speech)
+            if word is not None:
+                return word
+        return None
+
+    async def fetch_random_word(self, part_of_speech: str) -> str:
         """
         Fetch a random word of the specified part of speech from Words API.
 
@@ -50,27 +361,77 @@ class Utility(commands.Cog):
         if not api_key:
             return None
 
-        url = f"https://wordsapiv1.p.rapidapi.com/words?partOfSpeech={part_of_speech}&random=true&lettersMin=3&lettersMax=10"
+        params = {
+            "partOfSpeech": part_of_speech,
+            "random": "true",
+            "lettersMin": "3",
+            "lettersMax": "10"
+        }
 
         headers = {
             "X-Mashape-Key": api_key,
-            "X-Mashape-Host": "wordsapiv1.p.rapidapi.com"
+            "X-Mashape-Host": WORDS_API_HOST
         }
 
         max_attempts = 5
-        for _ in range(max_attempts):
+        for attempt in range(max_attempts):
             try:
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                data = response.json()
-                word = data.get('word', None)
-                if word and ' ' not in word:
-                    return word
-            except requests.exceptions.RequestException as e:
-                log.error(f"Error fetching {part_of_speech}: {e}")
+                async with self.telemetry.track("wordsapi") as timer, self.session.get(
+                    WORDS_API_URL, params=params, headers=headers, timeout=WORDS_API_TIMEOUT
+                ) as response:
+                    timer.status = response.status
+                    response.raise_for_status()
+                    data = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.error(f"Error fetching {part_of_speech}: {e!r}")
                 return None
+            word = data.get('word', None)
+            if is_valid_word(word):
+                return word
+            if attempt < max_attempts - 1:
+                self.telemetry.retry("wordsapi")
         return None
 
+    async def _timed_random_word(self, part_of_speech: str) -> tuple:
+        """Fetch a random word and return it along with how long the lookup took."""
+        start = time.perf_counter()
+        word = await self.get_random_word(part_of_speech)
+        return word, time.perf_counter() - start
+
+    async def get_random_words(self, *parts_of_speech: str) -> Optional[Dict[str, str]]:
+        """
+        Fetch one random word per part of speech concurrently.
+
+        As soon as one lookup fails for good, the remaining lookups are cancelled.
+
+        Args:
+            parts_of_speech: The parts of speech to fetch, e.g. 'adjective', 'noun', 'verb'
+
+        Returns:
+            A dict mapping each part of speech to its word, or None if any lookup fails
+        """
+        tasks = {asyncio.ensure_future(self._timed_random_word(pos)): pos for pos in parts_of_speech}
+        words = {}
+        timings = {}
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    part_of_speech = tasks[task]
+                    word, timings[part_of_speech] = task.result()
+                    if word is None:
+                        log.debug(f"Fetching {part_of_speech} failed after {timings[part_of_speech]:.3f}s, cancelling the rest")
+                        return None
+                    words[part_of_speech] = word
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self.word_timings = timings
+        log.debug(f"Word lookup timings: {format_timings(timings)}")
+        return words
+
     async def generate_womp_phrase(self) -> str:
         """
         Generate a phrase where Womp finds a random item.
@@ -78,227 +439,188 @@ class Utility(commands.Cog):
         Returns:
             A formatted string with the phrase, or an error message
         """
-        # Check if API key is set
-        api_key = await self.config.api_key()
-        if not api_key:
-            return "Error: No API key set! Please use `[p]womp api <your_api_key>` to set your Words API key."
-
-        # Fetch random words
-        adjective = await self.get_random_word('adjective')
-        noun = await self.get_random_word('noun')
-        verb = await self.get_random_word('verb')
+        # Fetch random words concurrently
+        words = await self.get_random_words('adjective', 'noun', 'verb')
 
         # Check if all words were successfully retrieved
-        if not all([adjective, noun, verb]):
-            return "Error: Could not fetch all words from the API."
+        if words is None:
+            return "Error: Could not find all the words for a forage."
+        adjective, noun, verb = words['adjective'], words['noun'], words['verb']
 
         # Format and return the phrase with item details
         phrase = f"Womp goes foraging and finds you a {adjective} {noun}. Would you like to {verb} it, sell it, or equip it?"
         return phrase, adjective, noun, verb
 
-    async def get_gemini_response(self, action: str, adjective: str, noun: str, verb: str, interaction: discord.Interaction = None) -> str:
+    async def stream_ai_response(
+        self,
+        action: str,
+        adjective: str,
+        noun: str,
+        verb: str,
+        priority: int = 1,
+        on_position: Callable[[int], Awaitable] = None
+    ) -> AsyncIterator[str]:
         """
-        Call Gemini API to generate a D&D-style narrative response.
+        Stream a D&D-style narrative response from the configured provider (Gemini or OpenRouter).
+
+        Narrations are served from the response cache when enough variants of the
+        same item and action have already been generated. Otherwise the request is
+        routed to the configured provider, with the other provider as a hedge and
+        failover when it has an API key set.
 
         Args:
             action: The action chosen ('verb', 'sell', or 'equip')
             adjective: The item's adjective
             noun: The item's noun
             verb: The random verb generated
-            interaction: Optional interaction for sending retry messages
+            priority: Place in the rate limit line, 0 for the bot owner
+            on_position: Awaited with the caller's place in line if they have to wait
 
-        Returns:
-            A narrative response with stat changes, or an error message
+        Raises:
+            ProviderError: If the provider could not produce a response
         """
-        gemini_api_key = await self.config.gemini_api_key()
-        if not gemini_api_key:
-            return "Error: No Gemini API key set! Use `[p]womp geminiapi <your_api_key>` to set it."
-
-        # Determine the action verb
-        if action == "verb":
-            action_verb = verb
-        elif action == "sell":
-            action_verb = "sell"
-        else:  # equip
-            action_verb = "equip"
-
-        # Create the prompt
-        prompt = f"""You are a Dungeon Master narrating the outcome of a player's action in a humorous D&D-style adventure.
-
-The player chose to {action_verb} a {adjective} {noun}.
-
-Generate a creative, entertaining response (2-3 sentences) describing what happens when they perform this action. Make it funny, dramatic, or unexpected.
-
-Then, decide if this action would increase or decrease ONE of these stats: attack, charisma, or intelligence. The stat change should be between -3 to +3.
-
-Format your response EXACTLY like this:
-[Your 2-3 sentence narrative here]
-
-Stat Change: [+/-][number] [stat name]
-
-Example:
-You bravely equip the rusty spoon as a helmet. It sits awkwardly on your head, and passersby can't help but laugh at your ridiculous appearance.
-
-Stat Change: -2 Charisma"""
-
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-3-flash-preview:generateContent?key={gemini_api_key}"
-
-        headers = {
-            "Content-Type": "application/json"
-        }
-
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }]
-        }
-
-        max_retries = 2
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=payload)
-
-                # Check for 503 error and retry
-                if response.status_code == 503 and attempt < max_retries - 1:
-                    log.warning(f"Gemini API returned 503, retrying in 5 seconds...")
-                    if interaction:
-                        await interaction.followup.send("Retrying...")
-                    await asyncio.sleep(5)
-                    continue
-
-                response.raise_for_status()
-                data = response.json()
-
-                # Extract the text from Gemini's response
-                if 'candidates' in data and len(data['candidates']) > 0:
-                    candidate = data['candidates'][0]
-
-                    # Check if content was blocked or has no parts
-                    if 'content' not in candidate or 'parts' not in candidate.get('content', {}):
-                        finish_reason = candidate.get('finishReason', 'UNKNOWN')
-                        log.warning(f"Gemini response missing content/parts. Finish reason: {finish_reason}")
-                        if finish_reason == 'SAFETY':
-                            return "The response was blocked by safety filters. Try again with a different item!"
-                        return f"Error: Gemini returned an incomplete response (reason: {finish_reason}). Try again!"
-
-                    text = candidate['content']['parts'][0]['text']
-                    return text.strip()
-                else:
-                    return "Error: Could not generate a response from Gemini."
-
-            except requests.exceptions.RequestException as e:
-                log.error(f"Error calling Gemini API: {e}")
-                return f"Error: Could not connect to Gemini API. {str(e)}"
+        routes = await self.get_routes()
+        action_verb = action_verb_for(action, verb)
+        # Look up under the route the router would send the request to, which is where it gets cached
+        available = self.router.available(routes)
+        if available:
+            primary = available[0]
+            cached = self.response_cache.get(
+                ResponseCache.make_key(primary.provider.name, primary.model, action_verb, adjective, noun)
+            )
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        prompt = build_prompt(action, adjective, noun, verb)
+        async for route, chunk in self.router.stream(prompt, routes, priority, on_position):
+            chunks.append(chunk)
+            yield chunk
+        self.response_cache.put(
+            ResponseCache.make_key(route.provider.name, route.model, action_verb, adjective, noun),
+            "".join(chunks).strip()
+        )
+
+    async def speculate(self, adjective: str, noun: str, verb: str) -> Optional[Dict[str, str]]:
+        """
+        Pre-narrate all three actions for a forage with a single combined request.
 
-        return "Error: Gemini API is currently unavailable (503). Please try again later."
+        Tokens spent are tracked in speculative_stats, including for requests
+        cancelled because the forage timed out.
 
-    async def get_openrouter_response(self, action: str, adjective: str, noun: str, verb: str, interaction: discord.Interaction = None) -> str:
+        Returns:
+            A dict mapping 'verb', 'sell' and 'equip' to their narration, or None on failure
         """
-        Call OpenRouter API to generate a D&D-style narrative response.
-
-        Args:
-            action: The action chosen ('verb', 'sell', or 'equip')
-            adjective: The item's adjective
-            noun: The item's noun
-            verb: The random verb generated
-            interaction: Optional interaction for sending retry messages
+        routes = await self.get_routes()
+        prompt = build_speculative_prompt(adjective, noun, verb)
+        stats = self.speculative_stats
+        usage = {}
+        chunks = []
+        stats["requests"] += 1
+        try:
+            async for _, chunk in self.router.stream(prompt, routes, SPECULATIVE_PRIORITY, usage=usage):
+                chunks.append(chunk)
+        except ProviderError as e:
+            log.debug(f"Speculative narration failed: {e}")
+            stats["failed"] += 1
+            return None
+        finally:
+            if chunks:
+                stats["tokens"] += usage.get("total_tokens") or estimate_tokens(prompt, *chunks)
+
+        narrations = parse_speculative_response("".join(chunks))
+        if narrations is None:
+            log.debug("Could not parse the speculative narration")
+            stats["failed"] += 1
+            return None
+        stats["narrations"] += len(narrations)
+        return narrations
+
+    async def get_routes(self) -> list:
+        """The configured provider's route first, followed by the other provider as a fallback."""
+        gemini = self.providers["gemini"]
+        openrouter = self.providers["openrouter"]
+        routes = [
+            Route(gemini, await self.config.gemini_api_key(), gemini.default_model),
+            Route(openrouter, await self.config.openrouter_api_key(), await self.config.openrouter_model()),
+        ]
+        if await self.config.use_openrouter():
+            routes.reverse()
+        return routes
+
+    async def get_ai_response(self, action: str, adjective: str, noun: str, verb: str) -> str:
+        """
+        Get the full AI response using the configured provider (Gemini or OpenRouter).
 
         Returns:
             A narrative response with stat changes, or an error message
         """
-        openrouter_api_key = await self.config.openrouter_api_key()
-        if not openrouter_api_key:
-            return "Error: No OpenRouter API key set! Use `[p]womp openrouterapi <your_api_key>` to set it."
-
-        # Determine the action verb
-        if action == "verb":
-            action_verb = verb
-        elif action == "sell":
-            action_verb = "sell"
-        else:  # equip
-            action_verb = "equip"
-
-        # Create the prompt
-        prompt = f"""You are a Dungeon Master narrating the outcome of a player's action in a humorous D&D-style adventure.
-
-The player chose to {action_verb} a {adjective} {noun}.
-
-Generate a creative, entertaining response (2-3 sentences) describing what happens when they perform this action. Make it funny, dramatic, or unexpected.
-
-Then, decide if this action would increase or decrease ONE of these stats: attack, charisma, or intelligence. The stat change should be between -3 to +3.
-
-Format your response EXACTLY like this:
-[Your 2-3 sentence narrative here]
-
-Stat Change: [+/-][number] [stat name]
-
-Example:
-You bravely equip the rusty spoon as a helmet. It sits awkwardly on your head, and passersby can't help but laugh at your ridiculous appearance.
-
-Stat Change: -2 Charisma"""
-
-        url = "https://openrouter.ai/api/v1/chat/completions"
-
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {openrouter_api_key}"
-        }
-
-        model = await self.config.openrouter_model()
-        payload = {
-            "model": model,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        }
-
-        max_retries = 2
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(url, headers=headers, json=payload)
-
-                # Check for 503 error and retry
-                if response.status_code == 503 and attempt < max_retries - 1:
-                    log.warning(f"OpenRouter API returned 503, retrying in 5 seconds...")
-                    if interaction:
-                        await interaction.followup.send("Retrying...")
-                    await asyncio.sleep(5)
-                    continue
-
-                response.raise_for_status()
-                data = response.json()
+        try:
+            chunks = [chunk async for chunk in self.stream_ai_response(action, adjective, noun, verb)]
+        except ProviderError as e:
+            return str(e)
+        return "".join(chunks).strip()
+
+    async def _export_metrics_loop(self):
+        """Periodically write the Prometheus metrics file, if one is configured."""
+        while True:
+            await asyncio.sleep(METRICS_EXPORT_INTERVAL)
+            path = await self.config.metrics_file()
+            if path:
+                try:
+                    await self._write_metrics(path)
+                except OSError as e:
+                    log.error(f"Could not write metrics to {path}: {e}")
+
+    async def _write_metrics(self, path: str):
+        text = self.telemetry.render_prometheus()
+        await asyncio.get_running_loop().run_in_executor(None, Path(path).write_text, text)
+
+    @commands.group(name="httpstats", invoke_without_command=True)
+    @commands.is_owner()
+    async def httpstats(self, ctx: commands.Context):
+        """Show latency percentiles, errors and retries for outbound HTTP calls"""
+        endpoints = self.telemetry.endpoints
+        if not endpoints:
+            await ctx.send("No outbound requests recorded yet.")
+            return
 
-                # Extract the text from OpenRouter's response
-                if 'choices' in data and len(data['choices']) > 0:
-                    choice = data['choices'][0]
-                    if 'message' in choice and 'content' in choice['message']:
-                        text = choice['message']['content']
-                        return text.strip()
-                    else:
-                        return "Error: OpenRouter returned an incomplete response. Try again!"
-                else:
-                    return "Error: Could not generate a response from OpenRouter."
+        def ms(seconds: float) -> str:
+            return f"{seconds * 1000:.0f}ms"
 
-            except requests.exceptions.RequestException as e:
-                log.error(f"Error calling OpenRouter API: {e}")
-                return f"Error: Could not connect to OpenRouter API. {str(e)}"
+        rows = [f"{'Endpoint':<22}{'Count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'Errors':>8}{'Retries':>9}"]
+        for name, stats in sorted(endpoints.items()):
+            latency = stats.latency
+            rows.append(
+                f"{name:<22}{latency.count:>7}{ms(latency.percentile(50)):>9}{ms(latency.percentile(95)):>9}"
+                f"{ms(latency.percentile(99)):>9}{stats.errors:>8}{stats.retries:>9}"
+            )
+        await ctx.send(box("\n".join(rows)))
 
-        return "Error: OpenRouter API is currently unavailable (503). Please try again later."
+    @httpstats.command(name="export")
+    async def httpstats_export(self, ctx: commands.Context, path: str = None):
+        """Write metrics in Prometheus text format to a file, refreshed every minute
 
-    async def get_ai_response(self, action: str, adjective: str, noun: str, verb: str, interaction: discord.Interaction = None) -> str:
-        """
-        Get AI response using the configured provider (Gemini or OpenRouter).
+        Pass no path to stop exporting.
         """
-        use_openrouter = await self.config.use_openrouter()
-        if use_openrouter:
-            return await self.get_openrouter_response(action, adjective, noun, verb, interaction)
-        else:
-            return await self.get_gemini_response(action, adjective, noun, verb, interaction)
+        if path is None:
+            await self.config.metrics_file.set(None)
+            await ctx.send("Stopped exporting metrics.")
+            return
+        try:
+            await self._write_metrics(path)
+        except OSError as e:
+            await ctx.send(f"Could not write to `{path}`: {e}")
+            return
+        await self.config.metrics_file.set(path)
+        await ctx.send(f"Metrics will be written to `{path}` every {METRICS_EXPORT_INTERVAL} seconds.")
+
+    @httpstats.command(name="reset")
+    async def httpstats_reset(self, ctx: commands.Context):
+        """Clear all recorded HTTP statistics"""
+        self.telemetry.reset()
+        await ctx.send("HTTP statistics cleared.")
 
     @commands.group(name="womp", invoke_without_command=True)
     async def womp_group(self, ctx: commands.Context):
@@ -319,6 +641,8 @@ Stat Change: -2 Charisma"""
         phrase, adjective, noun, verb = result
         view = WompActionView(self, adjective, noun, verb, ctx.author.id)
         await ctx.send(phrase, view=view)
+        if await self.config.speculative():
+            view.start_speculation()
 
     @womp_group.command(name="wordsapi")
     @commands.is_owner()
@@ -356,6 +680,179 @@ Stat Change: -2 Charisma"""
         except discord.Forbidden:
             await ctx.send("Warning: Could not delete your message. Please manually delete it to protect your API key.")
 
+    @womp_group.command(name="pool")
+    @commands.is_owner()
+    async def womp_pool(self, ctx: commands.Context, low_water: int = None, batch_size: int = None):
+        """View the word pool and the last forage's lookup times, or set its low-water mark and refill batch size"""
+        if low_water is None:
+            sizes = self.word_pool.sizes()
+            timings = format_timings(self.word_timings) if self.word_timings else "no forages yet"
+            await ctx.send(
+                f"Word pool: {sizes['adjective']} adjectives, {sizes['noun']} nouns, {sizes['verb']} verbs\n"
+                f"Refills {self.word_pool.batch_size} words at a time when below {self.word_pool.low_water}.\n"
+                f"Last forage lookups: {timings}"
+            )
+            return
+
+        if low_water < 0 or (batch_size is not None and batch_size < 1):
+            await ctx.send("The low-water mark can't be negative and the batch size must be at least 1.")
+            return
+
+        await self.config.pool_low_water.set(low_water)
+        self.word_pool.low_water = low_water
+        if batch_size is not None:
+            await self.config.pool_batch_size.set(batch_size)
+            self.word_pool.batch_size = batch_size
+        self.word_pool.wake()
+        await ctx.send(f"Word pool will refill {self.word_pool.batch_size} words at a time when below {low_water}.")
+
+    @womp_group.group(name="cache", invoke_without_command=True)
+    @commands.is_owner()
+    async def womp_cache(self, ctx: commands.Context):
+        """View AI response cache statistics"""
+        cache = self.response_cache
+        lookups = cache.hits + cache.misses
+        hit_rate = f"{cache.hits / lookups:.0%}" if lookups else "N/A"
+        persist = await self.config.cache_persist()
+        await ctx.send(
+            f"Response cache: {len(cache)}/{cache.max_entries} items, {cache.variety} variant(s) each, "
+            f"expiring after {cache.ttl} seconds (persisted: {'yes' if persist else 'no'})\n"
+            f"Hits: {cache.hits} | Misses: {cache.misses} | Hit rate: {hit_rate}"
+        )
+
+    @womp_cache.command(name="variety")
+    async def womp_cache_variety(self, ctx: commands.Context, variants: int):
+        """Set how many different narrations to keep for the same item and action"""
+        if variants < 1:
+            await ctx.send("Variety must be at least 1.")
+            return
+        await self.config.cache_variety.set(variants)
+        self.response_cache.variety = variants
+        await ctx.send(f"The cache will now keep up to {variants} narration(s) per item and action.")
+
+    @womp_cache.command(name="ttl")
+    async def womp_cache_ttl(self, ctx: commands.Context, seconds: int):
+        """Set how long cached narrations are kept, in seconds"""
+        if seconds < 1:
+            await ctx.send("The TTL must be at least 1 second.")
+            return
+        await self.config.cache_ttl.set(seconds)
+        self.response_cache.ttl = seconds
+        await ctx.send(f"Cached narrations now expire after {seconds} seconds.")
+
+    @womp_cache.command(name="size")
+    async def womp_cache_size(self, ctx: commands.Context, items: int):
+        """Set how many item and action combinations the cache holds"""
+        if items < 1:
+            await ctx.send("The cache size must be at least 1.")
+            return
+        await self.config.cache_size.set(items)
+        self.response_cache.max_entries = items
+        await ctx.send(f"The cache now holds up to {items} item and action combinations.")
+
+    @womp_cache.command(name="persist")
+    async def womp_cache_persist(self, ctx: commands.Context, enabled: bool):
+        """Toggle saving the cache between reloads"""
+        await self.config.cache_persist.set(enabled)
+        if not enabled:
+            await self.config.response_cache.clear()
+        await ctx.send(f"Response cache persistence has been {'enabled' if enabled else 'disabled'}.")
+
+    @womp_cache.command(name="clear")
+    async def womp_cache_clear(self, ctx: commands.Context):
+        """Clear the response cache and its counters"""
+        self.response_cache.clear()
+        await self.config.response_cache.clear()
+        await ctx.send("Response cache cleared.")
+
+    @womp_group.command(name="hedge")
+    @commands.is_owner()
+    async def womp_hedge(self, ctx: commands.Context, seconds: float = None):
+        """View provider health, or set how long to wait for the first words before asking the other provider
+
+        Use 0 to only fall back when the configured provider fails.
+        """
+        if seconds is None:
+            router = self.router
+            lines = [
+                f"Hedge delay: {router.hedge_delay} seconds",
+                f"Hedged requests: {router.hedges} ({router.hedge_wins} won by the backup) | Failovers: {router.failovers}",
+            ]
+            for name, provider in self.providers.items():
+                breaker = router.breaker(name)
+                state = "open (skipped)" if breaker.is_open else "closed"
+                lines.append(f"{provider.label}: circuit {state}, {breaker.failures} consecutive failure(s)")
+            await ctx.send("\n".join(lines))
+            return
+
+        if seconds < 0:
+            await ctx.send("The hedge delay can't be negative.")
+            return
+        await self.config.hedge_delay.set(seconds)
+        self.router.hedge_delay = seconds
+        if seconds == 0:
+            await ctx.send("Hedging disabled. The other provider will only be used if the configured one fails.")
+        else:
+            await ctx.send(f"The other provider will be asked if no words arrive within {seconds} seconds.")
+
+    @womp_group.command(name="ratelimit")
+    @commands.is_owner()
+    async def womp_ratelimit(
+        self, ctx: commands.Context, per_minute: float = None, burst: int = None, max_wait: float = None
+    ):
+        """View or set the AI request rate limit per provider and model
+
+        `per_minute` is the sustained rate, `burst` how many requests can go out at once,
+        and `max_wait` how many seconds someone may wait in line before being turned away.
+        """
+        limiter = self.router.limiter
+        if per_minute is None:
+            lines = [
+                f"{limiter.per_minute} requests per minute, bursts of {limiter.burst}, "
+                f"waiting at most {limiter.max_wait} seconds in line"
+            ]
+            for (provider, model), queue in limiter.queues.items():
+                lines.append(f"{provider} ({model}): {len(queue)} in line")
+            await ctx.send("\n".join(lines))
+            return
+
+        burst = limiter.burst if burst is None else burst
+        max_wait = limiter.max_wait if max_wait is None else max_wait
+        if per_minute <= 0 or burst < 1 or max_wait < 0:
+            await ctx.send("The rate must be positive, the burst at least 1 and the wait can't be negative.")
+            return
+        await self.config.rate_per_minute.set(per_minute)
+        await self.config.rate_burst.set(burst)
+        await self.config.queue_max_wait.set(max_wait)
+        limiter.configure(per_minute, burst, max_wait)
+        await ctx.send(
+            f"AI requests limited to {per_minute} per minute per model, bursts of {burst}, "
+            f"waiting at most {max_wait} seconds in line."
+        )
+
+    @womp_group.command(name="speculative")
+    @commands.is_owner()
+    async def womp_speculative(self, ctx: commands.Context, enabled: bool = None):
+        """Toggle pre-narrating all three outcomes as soon as a forage is shown, or view its cost
+
+        Button presses resolve instantly, at the cost of paying for outcomes nobody picks.
+        """
+        if enabled is None:
+            stats = self.speculative_stats
+            current = await self.config.speculative()
+            # Each forage's request pays for three narrations, but only one of them can be used
+            used_tokens = stats["tokens"] * stats["used"] / stats["narrations"] if stats["narrations"] else 0
+            await ctx.send(
+                f"Speculative narration is **{'on' if current else 'off'}**.\n"
+                f"Requests: {stats['requests']} ({stats['failed']} failed) | Tokens spent: {stats['tokens']}\n"
+                f"Narrations: {stats['narrations']} generated, {stats['used']} used "
+                f"(~{used_tokens:.0f} tokens used, ~{stats['tokens'] - used_tokens:.0f} wasted)"
+            )
+            return
+
+        await self.config.speculative.set(enabled)
+        await ctx.send(f"Speculative narration has been turned **{'on' if enabled else 'off'}**.")
+
     @womp_group.command(name="provider")
     @commands.is_owner()
     async def womp_provider(self, ctx: commands.Context, provider: str = None):
@@ -400,6 +897,8 @@ Stat Change: -2 Charisma"""
         phrase, adjective, noun, verb = result
         view = WompActionView(self, adjective, noun, verb, interaction.user.id)
         await interaction.response.send_message(phrase, view=view)
+        if await self.config.speculative():
+            view.start_speculation()
 
     @commands.command(name="wpc")
     async def wpc(self, ctx: commands.Context) -> None:
@@ -438,6 +937,7 @@ class WompActionView(discord.ui.View):
         self.noun = noun
         self.verb = verb
         self.user_id = user_id
+        self.speculation: Optional[asyncio.Task] = None
 
         # Update the first button label with the random verb
         self.children[0].label = f"{verb.capitalize()} it"
@@ -447,12 +947,85 @@ class WompActionView(discord.ui.View):
         match = re.search(r"Stat Change:\s*([+-]?\d+)", response)
         return match is not None and int(match.group(1)) > 0
 
-    async def _handle_response(self, interaction: discord.Interaction, response: str):
+    def start_speculation(self):
+        """Start pre-narrating all three outcomes in the background."""
+        self.speculation = asyncio.create_task(self.cog.speculate(self.adjective, self.noun, self.verb))
+
+    async def on_timeout(self):
+        if self.speculation is not None:
+            self.speculation.cancel()
+
+    async def _speculative_response(self, action: str) -> Optional[str]:
+        """The pre-narrated outcome for an action, waiting for it if it's still being generated."""
+        if self.speculation is None:
+            return None
+        try:
+            narrations = await self.speculation
+        except asyncio.CancelledError:
+            return None
+        if narrations is None:
+            return None
+        self.cog.speculative_stats["used"] += 1
+        return narrations[action]
+
+    async def _handle_response(self, interaction: discord.Interaction, action: str):
         """Send the AI response and dispatch event if positive outcome."""
-        await interaction.followup.send(response)
+        response = await self._speculative_response(action)
+        if response is None:
+            response = await self._stream_response(interaction, action)
+            if response is None:
+                return
+        else:
+            await interaction.followup.send(response[:2000])
+
         if self._check_positive_outcome(response):
             self.cog.bot.dispatch("womp_positive_outcome", interaction.user, interaction.channel)
 
+    async def _stream_response(self, interaction: discord.Interaction, action: str) -> Optional[str]:
+        """Stream the AI response into a follow-up message. Returns the full response, or None on error."""
+        response = ""
+        shown = ""
+        message = None
+        last_edit = 0.0
+
+        async def on_position(position: int):
+            nonlocal message
+            message = await interaction.followup.send(
+                f"Womp is busy! You're #{position} in line, your adventure will continue shortly...", wait=True
+            )
+
+        priority = 0 if await self.cog.bot.is_owner(interaction.user) else 1
+        try:
+            async for chunk in self.cog.stream_ai_response(
+                action, self.adjective, self.noun, self.verb, priority, on_position
+            ):
+                response += chunk
+                # Discord rejects blank messages, and models often stream a leading newline first
+                if not response.strip():
+                    continue
+                # Edits are throttled to stay clear of Discord's rate limits
+                if message is None:
+                    shown = response.strip()[:2000]
+                    message = await interaction.followup.send(shown, wait=True)
+                    last_edit = time.monotonic()
+                elif not shown or time.monotonic() - last_edit >= STREAM_EDIT_INTERVAL:
+                    shown = response.strip()[:2000]
+                    await message.edit(content=shown)
+                    last_edit = time.monotonic()
+            if not response.strip():
+                raise ProviderError("Error: Could not generate a response.")
+        except ProviderError as e:
+            if message is None:
+                await interaction.followup.send(str(e))
+            else:
+                await message.edit(content=f"{response.strip()}\n\n{e}".strip()[:2000])
+            return None
+
+        response = response.strip()
+        if response[:2000] != shown:
+            await message.edit(content=response[:2000])
+        return response
+
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         """Only allow the original user to interact with the buttons"""
         if interaction.user.id != self.user_id:
@@ -470,24 +1043,21 @@ class WompActionView(discord.ui.View):
     async def verb_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self.disable_all_buttons(interaction)
         await interaction.response.defer()
-        response = await self.cog.get_ai_response("verb", self.adjective, self.noun, self.verb, interaction)
-        await self._handle_response(interaction, response)
+        await self._handle_response(interaction, "verb")
         self.stop()
 
     @discord.ui.button(label="Sell it", style=discord.ButtonStyle.success)
     async def sell_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self.disable_all_buttons(interaction)
         await interaction.response.defer()
-        response = await self.cog.get_ai_response("sell", self.adjective, self.noun, self.verb, interaction)
-        await self._handle_response(interaction, response)
+        await self._handle_response(interaction, "sell")
         self.stop()
 
     @discord.ui.button(label="Equip it", style=discord.ButtonStyle.danger)
     async def equip_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await self.disable_all_buttons(interaction)
         await interaction.response.defer()
-        response = await self.cog.get_ai_response("equip", self.adjective, self.noun, self.verb, interaction)
-        await self._handle_response(interaction, response)
+        await self._handle_response(interaction, "equip")
         self.stop()
 
 
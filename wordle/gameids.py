@@ -0,0 +1,80 @@
+from bisect import bisect_right
+from typing import Iterable, Iterator, List
+
+
+class GameIdSet:
+    """
+    Set of Wordle game ids stored as sorted, merged [first, last] runs.
+
+    Players mostly solve day after day, so a few years of games collapse
+    into a handful of runs. Membership is a bisect over the runs, and the
+    current streak is simply the length of the last run.
+    """
+
+    __slots__ = ("_starts", "_ends", "_count")
+
+    def __init__(self, gameids: Iterable[int] = ()):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._count = 0
+        for gameid in sorted(set(gameids)):
+            self.add(gameid)
+
+    @classmethod
+    def from_raw(cls, raw: list) -> "GameIdSet":
+        """Load runs stored by to_raw, or a plain list of game ids from the old format."""
+        gameids = cls()
+        if raw and not isinstance(raw[0], list):
+            return cls(raw)
+        for start, end in raw:
+            gameids._starts.append(start)
+            gameids._ends.append(end)
+            gameids._count += end - start + 1
+        return gameids
+
+    def to_raw(self) -> list:
+        """Serialize for Config as a list of [first, last] runs."""
+        return [[start, end] for start, end in zip(self._starts, self._ends)]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, gameid: int) -> bool:
+        index = bisect_right(self._starts, gameid) - 1
+        return index >= 0 and gameid <= self._ends[index]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in zip(self._starts, self._ends):
+            yield from range(start, end + 1)
+
+    def add(self, gameid: int) -> bool:
+        """Add a game id. Returns False if it was already in the set."""
+        index = bisect_right(self._starts, gameid) - 1
+        if index >= 0 and gameid <= self._ends[index]:
+            return False
+
+        joins_left = index >= 0 and self._ends[index] == gameid - 1
+        joins_right = index + 1 < len(self._starts) and self._starts[index + 1] == gameid + 1
+        if joins_left and joins_right:
+            self._ends[index] = self._ends[index + 1]
+            del self._starts[index + 1]
+            del self._ends[index + 1]
+        elif joins_left:
+            self._ends[index] = gameid
+        elif joins_right:
+            self._starts[index + 1] = gameid
+        else:
+            self._starts.insert(index + 1, gameid)
+            self._ends.insert(index + 1, gameid)
+        self._count += 1
+        return True
+
+    @property
+    def last(self) -> int:
+        """Latest game id played, or 0 if none."""
+        return self._ends[-1] if self._ends else 0
+
+    @property
+    def streak(self) -> int:
+        """Consecutive games ending at the latest one played."""
+        return self._ends[-1] - self._starts[-1] + 1 if self._ends else 0
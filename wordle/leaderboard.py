@@ -0,0 +1,87 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class Standing(NamedTuple):
+    """A member's leaderboard numbers."""
+
+    member_id: int
+    total_score: int
+    n_games: int
+    # Average attempts per solve, or None before the first solve
+    avg_attempts: Optional[float]
+
+
+class Leaderboard:
+    """
+    A guild's Wordle rankings, kept sorted as results come in.
+
+    Members are held in two sorted lists, one by total score and one by
+    average attempts, so a page of either board is a slice and a member's
+    rank is a bisect. Ties are broken by member id to keep the order stable.
+    """
+
+    def __init__(self):
+        self.standings: Dict[int, Standing] = {}
+        # (-total score, member id), best first
+        self._by_score: List[Tuple[int, int]] = []
+        # (average attempts, member id), best first; only members with a solve
+        self._by_average: List[Tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.standings)
+
+    @staticmethod
+    def _score_key(standing: Standing) -> Tuple[int, int]:
+        return -standing.total_score, standing.member_id
+
+    @staticmethod
+    def _average_key(standing: Standing) -> Tuple[float, int]:
+        return standing.avg_attempts, standing.member_id
+
+    def update(self, member_id: int, stats: dict):
+        """Re-rank a member from their stats. Members without games are left off."""
+        self.remove(member_id)
+        if not len(stats['gameids']):
+            return
+        solves = sum(stats['qty'])
+        attempts = sum(n * count for n, count in enumerate(stats['qty'], 1))
+        standing = Standing(member_id, stats['total_score'], len(stats['gameids']), attempts / solves if solves else None)
+        self.standings[member_id] = standing
+        insort(self._by_score, self._score_key(standing))
+        if standing.avg_attempts is not None:
+            insort(self._by_average, self._average_key(standing))
+
+    def remove(self, member_id: int):
+        standing = self.standings.pop(member_id, None)
+        if standing is None:
+            return
+        del self._by_score[bisect_left(self._by_score, self._score_key(standing))]
+        if standing.avg_attempts is not None:
+            del self._by_average[bisect_left(self._by_average, self._average_key(standing))]
+
+    def top_scores(self, start: int = 0, count: int = 5) -> List[Standing]:
+        """Members by total score, highest first, from the 0-based `start` rank."""
+        return [self.standings[member_id] for _, member_id in self._by_score[start:start + count]]
+
+    def top_averages(self, start: int = 0, count: int = 5) -> List[Standing]:
+        """Members by average attempts per solve, lowest first, from the 0-based `start` rank."""
+        return [self.standings[member_id] for _, member_id in self._by_average[start:start + count]]
+
+    @property
+    def n_ranked_averages(self) -> int:
+        return len(self._by_average)
+
+    def score_rank(self, member_id: int) -> Optional[int]:
+        """1-based rank by total score, or None if the member has no stats."""
+        standing = self.standings.get(member_id)
+        if standing is None:
+            return None
+        return bisect_left(self._by_score, self._score_key(standing)) + 1
+
+    def average_rank(self, member_id: int) -> Optional[int]:
+        """1-based rank by average attempts, or None if the member hasn't solved one yet."""
+        standing = self.standings.get(member_id)
+        if standing is None or standing.avg_attempts is None:
+            return None
+        return bisect_left(self._by_average, self._average_key(standing)) + 1
@@ -0,0 +1,312 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from redbot.core import commands
+from redbot.core.utils.chat_formatting import humanize_list
+
+from .gameids import GameIdSet
+
+
+def _game_id(text: str) -> int:
+    return int(text.replace(",", ""))  # Remove comma if present
+
+
+class Puzzle(ABC):
+    """
+    A daily puzzle whose shared results the cog tracks.
+
+    Every result boils down to a game id and an "attempts" bucket from 1
+    (best) to max_attempts, or None for a failed game. Stats, leaderboards
+    and scoring are all built on that, so a puzzle only has to know how to
+    parse its share text.
+    """
+
+    name: str
+    label: str
+    # Regex for the start of a share; combined with every other puzzle's into one pattern
+    header: str
+    max_attempts = 6
+    can_fail = True
+    # Title of the leaderboard ranking members by their average bucket
+    average_title = "Average Attempts"
+
+    @abstractmethod
+    def parse(self, content: str) -> Optional[Tuple[int, Optional[int]]]:
+        """Parse a message that starts with this puzzle's header into (gameid, attempts)."""
+
+    def bucket_name(self, attempts: int) -> str:
+        return f"{attempts} attempt" + ("s" if attempts != 1 else "")
+
+    def histogram_label(self, attempts: int) -> str:
+        return f"{attempts}\N{COMBINING ENCLOSING KEYCAP}"
+
+    def points(self, attempts: int) -> int:
+        """Points for a solve; the best bucket earns max_attempts, the worst 1."""
+        return self.max_attempts + 1 - attempts
+
+    def format_average(self, average: float) -> str:
+        return f"{average:.2f} per solve"
+
+    @property
+    def scoring(self) -> str:
+        return "\n".join(
+            f"{self.bucket_name(n)}: {self.points(n)} pt" + ("s" if self.points(n) != 1 else "")
+            for n in range(1, self.max_attempts + 1)
+        )
+
+    # Per-member stats: solved and failed game ids as GameIdSets, total score, and solves per bucket
+
+    def new_stats(self) -> dict:
+        return {'gameids': GameIdSet(), 'failedids': GameIdSet(), 'total_score': 0, 'qty': [0] * self.max_attempts}
+
+    @staticmethod
+    def load_stats(raw: dict) -> dict:
+        """Turn stats from Config into their in-memory form, migrating old game id lists."""
+        return {
+            'gameids': GameIdSet.from_raw(raw['gameids']),
+            'failedids': GameIdSet.from_raw(raw.get('failedids', [])),
+            'total_score': raw['total_score'],
+            'qty': list(raw['qty'])
+        }
+
+    @staticmethod
+    def dump_stats(stats: dict) -> dict:
+        """Copy in-memory stats into the form stored in Config."""
+        return {
+            'gameids': stats['gameids'].to_raw(),
+            'failedids': stats['failedids'].to_raw(),
+            'total_score': stats['total_score'],
+            'qty': list(stats['qty'])
+        }
+
+    def apply(self, stats: dict, gameid: int, attempts: Optional[int]) -> bool:
+        """Add a result to stats, attempts being None for a failed game.
+        Returns False if the game was already recorded."""
+
+        # Avoid duplicates
+        if gameid in stats['gameids'] or gameid in stats['failedids']:
+            return False
+
+        if attempts is None:
+            # Failed games score nothing and end the streak
+            stats['failedids'].add(gameid)
+            return True
+        stats['gameids'].add(gameid)
+        stats['total_score'] += self.points(attempts)
+        stats['qty'][attempts-1] += 1
+        return True
+
+    @staticmethod
+    def streak(stats: dict) -> int:
+        """Consecutive solves ending at the latest game played; a failure since then resets it."""
+        if stats['failedids'].last > stats['gameids'].last:
+            return 0
+        return stats['gameids'].streak
+
+
+class GridPuzzle(Puzzle):
+    """Wordle-style share: "<Name> <id> <n>/6", a blank line, then one emoji row per guess."""
+
+    def __init__(self, name: str, label: str, header: str, row: str):
+        self.name = name
+        self.label = label
+        self.header = header
+        self._header = re.compile(header)
+        self._row = re.compile(row)
+
+    def parse(self, content):
+        match = self._header.match(content)
+        if match is None:
+            return None
+        gameid = _game_id(match.group(1))
+        attempts = None if match.group(2) == "X" else int(match.group(2))
+        rows = attempts or self.max_attempts
+
+        # Header, blank line, then one grid row per attempt; anything after the grid isn't split
+        lines = content.split('\n', rows + 2)
+
+        # Early exit for messages without requisite emoji rows
+        if len(lines) < rows + 2:
+            return None
+
+        # Integrity check of emoji grid
+        for line in lines[2:rows + 2]:
+            if self._row.fullmatch(line) is None:
+                return None
+        return gameid, attempts
+
+
+class Wordle(GridPuzzle):
+    def __init__(self):
+        super().__init__(
+            "wordle",
+            "Wordle",
+            r"Wordle (\d{0,3},?\d{3}) ([1-6X])/6",
+            "[\N{BLACK LARGE SQUARE}\N{WHITE LARGE SQUARE}\N{LARGE GREEN SQUARE}"
+            "\N{LARGE YELLOW SQUARE}\N{LARGE ORANGE SQUARE}\N{LARGE BLUE SQUARE}]+"
+        )
+
+    def points(self, attempts):
+        if attempts == 1:
+            # First guess gets 10 points
+            return 10
+        # Second guess gets 5, third guess gets 4, etc.
+        return 7 - attempts
+
+
+class Connections(Puzzle):
+    """Four rows of four colored squares per group found, one row per guess; four mistakes end the game."""
+
+    name = "connections"
+    label = "Connections"
+    header = r"Connections\s*\nPuzzle #([\d,]+)"
+    # Solved with 0-3 mistakes
+    max_attempts = 4
+    average_title = "Average Mistakes"
+
+    _header = re.compile(header)
+    _row = re.compile(
+        "[\N{LARGE YELLOW SQUARE}\N{LARGE GREEN SQUARE}\N{LARGE BLUE SQUARE}\N{LARGE PURPLE SQUARE}]{4}"
+    )
+
+    def parse(self, content):
+        match = self._header.match(content)
+        if match is None:
+            return None
+        # At most 4 groups plus 4 mistakes worth of rows follow the header
+        rows = []
+        for line in content[match.end():].split('\n', 9)[1:9]:
+            if self._row.fullmatch(line) is None:
+                break
+            rows.append(line)
+        solved = sum(1 for row in rows if len(set(row)) == 1)
+        mistakes = len(rows) - solved
+        if solved == 4 and mistakes < 4:
+            return _game_id(match.group(1)), mistakes + 1
+        if mistakes == 4:
+            return _game_id(match.group(1)), None
+        return None
+
+    def bucket_name(self, attempts):
+        return f"{attempts - 1} mistake" + ("s" if attempts != 2 else "")
+
+    def histogram_label(self, attempts):
+        return f"{attempts - 1}\N{COMBINING ENCLOSING KEYCAP}"
+
+    def format_average(self, average):
+        return f"{average - 1:.2f} mistakes per solve"
+
+
+class Strands(Puzzle):
+    """Rows of blue dots per theme word, a yellow one for the spangram and a bulb per hint used."""
+
+    name = "strands"
+    label = "Strands"
+    header = r"Strands #([\d,]+)"
+    # Hints used: 0 to 4, then 5 or more
+    max_attempts = 6
+    can_fail = False
+    average_title = "Average Hints"
+
+    _header = re.compile(header)
+    _row = re.compile("[\N{LARGE BLUE CIRCLE}\N{LARGE YELLOW CIRCLE}\N{ELECTRIC LIGHT BULB}]+")
+
+    def parse(self, content):
+        match = self._header.match(content)
+        if match is None:
+            return None
+        # Header, theme line, then the dot rows
+        rows = []
+        for line in content.split('\n', 12)[2:12]:
+            if self._row.fullmatch(line) is None:
+                break
+            rows.append(line)
+        if not any("\N{LARGE YELLOW CIRCLE}" in row for row in rows):
+            return None
+        hints = sum(row.count("\N{ELECTRIC LIGHT BULB}") for row in rows)
+        return _game_id(match.group(1)), min(hints, self.max_attempts - 1) + 1
+
+    def bucket_name(self, attempts):
+        hints = f"{attempts - 1}+" if attempts == self.max_attempts else f"{attempts - 1}"
+        return f"{hints} hint" + ("s" if attempts != 2 else "")
+
+    def histogram_label(self, attempts):
+        return f"{attempts - 1}\N{COMBINING ENCLOSING KEYCAP}" + ("+" if attempts == self.max_attempts else "")
+
+    def format_average(self, average):
+        return f"{average - 1:.2f} hints per solve"
+
+
+class Framed(Puzzle):
+    """A camera then six squares, the green one marking the guess that named the movie."""
+
+    name = "framed"
+    label = "Framed"
+    header = r"Framed #([\d,]+)"
+
+    _header = re.compile(header + r"\s*\n\N{MOVIE CAMERA}((?: [\N{LARGE RED SQUARE}\N{LARGE GREEN SQUARE}\N{BLACK LARGE SQUARE}]){6})")
+
+    def parse(self, content):
+        match = self._header.match(content)
+        if match is None:
+            return None
+        squares = match.group(2).split()
+        if "\N{LARGE GREEN SQUARE}" not in squares:
+            return _game_id(match.group(1)), None
+        return _game_id(match.group(1)), squares.index("\N{LARGE GREEN SQUARE}") + 1
+
+
+class Result(NamedTuple):
+    puzzle: Puzzle
+    gameid: int
+    # 1 to puzzle.max_attempts, or None for a failed game
+    attempts: Optional[int]
+
+
+WORDLE = Wordle()
+PUZZLES: List[Puzzle] = [
+    WORDLE,
+    Connections(),
+    Strands(),
+    GridPuzzle(
+        "nerdle",
+        "Nerdle",
+        r"nerdlegame (\d+) ([1-6X])/6",
+        "[\N{LARGE GREEN SQUARE}\N{LARGE PURPLE SQUARE}\N{BLACK LARGE SQUARE}\N{WHITE LARGE SQUARE}]+"
+    ),
+    Framed(),
+]
+PUZZLES_BY_NAME: Dict[str, Puzzle] = {puzzle.name: puzzle for puzzle in PUZZLES}
+
+# Every header in one pattern, so recognizing a share costs one match however many puzzles there are
+_HEADERS = re.compile("|".join(f"(?P<{puzzle.name}>{puzzle.header})" for puzzle in PUZZLES))
+# First character of every header, a cheap check that rejects nearly every message
+_FIRST_CHARS = frozenset(puzzle.header[0] for puzzle in PUZZLES)
+
+
+def parse_result(content: str) -> Optional[Result]:
+    """Recognize a shared puzzle result in raw message content."""
+    if not content or content[0] not in _FIRST_CHARS:
+        return None
+    match = _HEADERS.match(content)
+    if match is None:
+        return None
+    # The outermost group closes last, so lastgroup names the puzzle whose header matched
+    puzzle = PUZZLES_BY_NAME[match.lastgroup]
+    parsed = puzzle.parse(content)
+    if parsed is None:
+        return None
+    return Result(puzzle, *parsed)
+
+
+class PuzzleConverter(commands.Converter):
+    """Converts a puzzle name, e.g. `connections`."""
+
+    async def convert(self, ctx: commands.Context, argument: str) -> Puzzle:
+        puzzle = PUZZLES_BY_NAME.get(argument.lower())
+        if puzzle is None:
+            raise commands.BadArgument(
+                f"Unknown puzzle `{argument}`, pick one of {humanize_list([p.name for p in PUZZLES])}."
+            )
+        return puzzle
@@ -0,0 +1,88 @@
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+
+# Games with fewer results than this aren't ranked by difficulty, one unlucky player doesn't make a puzzle hard
+HARDEST_MIN_PLAYERS = 3
+
+
+class ServerStats:
+    """
+    A guild's results for one puzzle, as a histogram per game id.
+
+    Each histogram is a fixed-size list of counts, one per attempts bucket
+    followed by failures, so recording a result is a single increment.
+    Totals over all games, the sorted game ids and a ranking of the hardest
+    games are kept up to date alongside, so nothing has to go over every
+    member or every game to answer a query.
+    """
+
+    def __init__(self, max_attempts: int):
+        self.max_attempts = max_attempts
+        # game id -> solves per bucket, then failures
+        self.games: Dict[int, List[int]] = {}
+        # Histogram of every game together
+        self.totals: List[int] = [0] * (max_attempts + 1)
+        self._gameids: List[int] = []
+        # (solve rate, -average attempts, game id), hardest first; only games with HARDEST_MIN_PLAYERS results
+        self._by_difficulty: List[Tuple[float, float, int]] = []
+
+    @classmethod
+    def from_raw(cls, max_attempts: int, raw: list) -> "ServerStats":
+        """Load histograms stored by to_raw."""
+        stats = cls(max_attempts)
+        for gameid, *counts in raw:
+            stats.games[gameid] = counts
+            stats._gameids.append(gameid)
+            for bucket, count in enumerate(counts):
+                stats.totals[bucket] += count
+            if sum(counts) >= HARDEST_MIN_PLAYERS:
+                stats._by_difficulty.append(stats._difficulty_key(gameid, counts))
+        stats._gameids.sort()
+        stats._by_difficulty.sort()
+        return stats
+
+    def to_raw(self) -> list:
+        """Serialize for Config as a list of [game id, *histogram]."""
+        return [[gameid, *self.games[gameid]] for gameid in self._gameids]
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    @staticmethod
+    def solve_rate(counts: List[int]) -> float:
+        return 1 - counts[-1] / sum(counts)
+
+    @staticmethod
+    def average_attempts(counts: List[int]) -> Optional[float]:
+        """Average attempts per solve, or None if nobody solved it."""
+        solves = sum(counts[:-1])
+        if not solves:
+            return None
+        return sum(n * count for n, count in enumerate(counts[:-1], 1)) / solves
+
+    def _difficulty_key(self, gameid: int, counts: List[int]) -> Tuple[float, float, int]:
+        average = self.average_attempts(counts)
+        return self.solve_rate(counts), -(average if average is not None else self.max_attempts + 1), gameid
+
+    def add(self, gameid: int, attempts: Optional[int]):
+        """Count a result, attempts being None for a failed game."""
+        counts = self.games.get(gameid)
+        if counts is None:
+            counts = self.games[gameid] = [0] * (self.max_attempts + 1)
+            insort(self._gameids, gameid)
+        elif sum(counts) >= HARDEST_MIN_PLAYERS:
+            del self._by_difficulty[bisect_left(self._by_difficulty, self._difficulty_key(gameid, counts))]
+
+        bucket = self.max_attempts if attempts is None else attempts - 1
+        counts[bucket] += 1
+        self.totals[bucket] += 1
+        if sum(counts) >= HARDEST_MIN_PLAYERS:
+            insort(self._by_difficulty, self._difficulty_key(gameid, counts))
+
+    def recent(self, count: int) -> List[Tuple[int, List[int]]]:
+        """The latest games with their histograms, newest first."""
+        return [(gameid, self.games[gameid]) for gameid in reversed(self._gameids[-count:])]
+
+    def hardest(self, count: int) -> List[Tuple[int, List[int]]]:
+        """Games by lowest solve rate, then highest average attempts, with their histograms."""
+        return [(gameid, self.games[gameid]) for _, _, gameid in self._by_difficulty[:count]]
@@ -0,0 +1,51 @@
+import asyncio
+import functools
+import uuid
+
+import discord
+import pytest
+from redbot.core import Config
+from redbot.core._drivers import JsonDriver
+
+from wordle.wordle import Wordle
+
+GUILD = discord.Object(1)
+
+
+def run_async(test):
+    """Run a coroutine test function in its own event loop, so no asyncio pytest plugin is needed."""
+    @functools.wraps(test)
+    def wrapper(*args, **kwargs):
+        return asyncio.run(test(*args, **kwargs))
+    return wrapper
+
+
+@pytest.fixture()
+def driver(tmp_path):
+    """Red's JSON driver, writing to a temporary directory."""
+    return JsonDriver("Wordle", uuid.uuid4().hex, data_path_override=tmp_path)
+
+
+@pytest.fixture()
+def cog(driver, monkeypatch):
+    config = Config("Wordle", driver.unique_cog_identifier, driver, force_registration=True)
+    monkeypatch.setattr(Config, "get_conf", lambda *args, **kwargs: config)
+    return Wordle(None)
+
+
+async def stored_stats(cog, member_id, guild_id=GUILD.id):
+    """A member's Wordle stats as written to Config."""
+    return cog._load_stats(await cog._stats_group(guild_id).members.get_raw(str(member_id)))['wordle']
+
+
+def count_writes(driver, monkeypatch) -> list:
+    """Record every Config write from here on, returned in a list that keeps filling."""
+    writes = []
+    driver_set = driver.set
+
+    async def set(identifier_data, value=None):
+        writes.append(identifier_data)
+        await driver_set(identifier_data, value=value)
+
+    monkeypatch.setattr(driver, "set", set)
+    return writes
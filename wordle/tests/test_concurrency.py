@@ -0,0 +1,158 @@
+import asyncio
+import gc
+import random
+from types import SimpleNamespace
+
+import discord
+
+from .conftest import GUILD, run_async, stored_stats
+
+
+def share(gameid, attempts):
+    rows = "\n".join(["\N{BLACK LARGE SQUARE}\N{LARGE YELLOW SQUARE}\N{LARGE GREEN SQUARE}"] * (attempts or 6))
+    return f"Wordle {gameid:,} {attempts or 'X'}/6\n\n{rows}"
+
+
+def expected(results):
+    """Member id -> (game id -> attempts), keeping each member's first result for a game."""
+    members = {}
+    for member_id, gameid, attempts in results:
+        members.setdefault(member_id, {}).setdefault(gameid, attempts)
+    return members
+
+
+def total_score(games):
+    return sum(10 if attempts == 1 else 7 - attempts for attempts in games.values() if attempts is not None)
+
+
+class Channel:
+    id = 5
+    mention = "#wordle"
+
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def history(self, limit, after=None, oldest_first=True):
+        for message in self.messages[:limit]:
+            # Hand control to live results between messages, like paging through real history would
+            await asyncio.sleep(0)
+            yield message
+
+
+class Context:
+    guild = GUILD
+    clean_prefix = "!"
+
+    async def send(self, content=None, **kwargs):
+        async def edit(**kwargs):
+            pass
+
+        return SimpleNamespace(edit=edit)
+
+
+def history(results):
+    return [
+        SimpleNamespace(id=message_id, author=discord.Object(member_id), content=share(gameid, attempts))
+        for message_id, (member_id, gameid, attempts) in enumerate(results, 1)
+    ]
+
+
+def hold_first_write(driver, monkeypatch) -> asyncio.Event:
+    """Make the next Config write wait until the returned event is set."""
+    driver_set = driver.set
+    release = asyncio.Event()
+    held = []
+
+    async def set(*args, **kwargs):
+        if not held:
+            held.append(args)
+            await release.wait()
+        await driver_set(*args, **kwargs)
+
+    monkeypatch.setattr(driver, "set", set)
+    return release
+
+
+@run_async
+async def test_simultaneous_results_are_all_counted(cog):
+    results = [
+        (member_id, gameid, random.choice([1, 2, 3, 4, 5, 6, None]))
+        for member_id in range(20)
+        for gameid in range(1000, 1030)
+    ]
+    # Every result posted twice, all at once
+    posted = results * 2
+    random.shuffle(posted)
+
+    await asyncio.gather(
+        *(cog._add_result(GUILD, discord.Object(member_id), gameid, attempts) for member_id, gameid, attempts in posted)
+    )
+    await cog._flush()
+
+    for member_id, games in expected(results).items():
+        for stats in (cog._stats[GUILD.id, member_id]['wordle'], await stored_stats(cog, member_id)):
+            assert stats['total_score'] == total_score(games)
+            assert len(stats['gameids']) + len(stats['failedids']) == len(games)
+    stats = cog._games[GUILD.id]['wordle']
+    assert sum(stats.totals) == len(results)
+
+    gc.collect()
+    assert not cog._locks
+
+
+@run_async
+async def test_live_results_during_reparse_are_kept(cog):
+    reparsed = [(member_id, gameid, 1 + gameid % 6) for gameid in range(1000, 1100) for member_id in range(5)]
+    live = [(member_id, gameid, 2) for gameid in range(2000, 2020) for member_id in range(5)]
+
+    async def post_live():
+        for member_id, gameid, attempts in live:
+            await cog._add_result(GUILD, discord.Object(member_id), gameid, attempts)
+            await asyncio.sleep(0)
+
+    await asyncio.gather(cog._reparse(Context(), Channel(history(reparsed)), len(reparsed), None), post_live())
+    # Posted again after the reparse, and ignored as duplicates
+    await post_live()
+    await cog._flush()
+
+    for member_id, games in expected(reparsed + live).items():
+        for stats in (cog._stats[GUILD.id, member_id]['wordle'], await stored_stats(cog, member_id)):
+            assert stats['total_score'] == total_score(games)
+            assert set(stats['gameids']) == set(games)
+    assert sum(cog._games[GUILD.id]['wordle'].totals) == len(reparsed) + len(live)
+
+
+@run_async
+async def test_flush_in_progress_does_not_overwrite_reparse(cog, driver, monkeypatch):
+    # Stats from before the reparse, waiting to be flushed
+    await cog._add_result(GUILD, discord.Object(1), 1000, 3)
+
+    # Hold up the first write, so the flush is still going when the reparse finishes
+    release = hold_first_write(driver, monkeypatch)
+
+    flush = asyncio.create_task(cog._flush())
+    await asyncio.sleep(0)
+    reparse = asyncio.create_task(cog._reparse(Context(), Channel(history([(1, 1100, 2)])), 1, None))
+    await asyncio.sleep(0.1)
+    release.set()
+    await asyncio.gather(flush, reparse)
+
+    stats = await stored_stats(cog, 1)
+    assert list(stats['gameids']) == [1100]
+    assert list(cog._stats[GUILD.id, 1]['wordle']['gameids']) == [1100]
+
+
+@run_async
+async def test_unload_during_flush_writes_everything(cog, driver, monkeypatch):
+    for member_id in range(10):
+        await cog._add_result(GUILD, discord.Object(member_id), 1000, 3)
+
+    # The periodic flush is stuck on its first write when the cog unloads
+    hold_first_write(driver, monkeypatch)
+    cog._flush_task = asyncio.create_task(cog._flush())
+    await asyncio.sleep(0)
+    await cog.cog_unload()
+
+    for member_id in range(10):
+        assert list((await stored_stats(cog, member_id))['gameids']) == [1000]
+    assert not cog._dirty
@@ -0,0 +1,47 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import discord
+
+from .conftest import GUILD
+from .test_parser_benchmark import CHATTER
+
+WORDLE_CHANNEL = 5
+# A second's worth of messages at 1k msg/s
+MESSAGES = 1000
+
+
+def stream(cog):
+    """Messages that aren't results: chatter in the Wordle channel, elsewhere in the guild, in other guilds and DMs."""
+    cog._channels[GUILD.id] = WORDLE_CHANNEL
+    author = SimpleNamespace(id=2, bot=False)
+    places = [
+        (GUILD, SimpleNamespace(id=WORDLE_CHANNEL)),
+        (GUILD, SimpleNamespace(id=6)),
+        (discord.Object(2), SimpleNamespace(id=7)),
+        (None, SimpleNamespace(id=8)),
+    ]
+    messages = []
+    for i in range(MESSAGES):
+        guild, channel = places[i % len(places)]
+        messages.append(SimpleNamespace(author=author, guild=guild, channel=channel, content=CHATTER[i % len(CHATTER)]))
+    return messages
+
+
+def test_listener_ignores_chatter(benchmark, cog):
+    messages = stream(cog)
+
+    async def listen():
+        for message in messages:
+            await cog.on_message_without_command(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        benchmark(lambda: loop.run_until_complete(listen()))
+    finally:
+        loop.close()
+    assert not cog._stats
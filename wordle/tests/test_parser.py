@@ -0,0 +1,134 @@
+import pytest
+
+from wordle.puzzles import _HEADERS, parse_result
+
+GUESS = "\N{BLACK LARGE SQUARE}\N{LARGE YELLOW SQUARE}\N{LARGE GREEN SQUARE}\N{WHITE LARGE SQUARE}\N{LARGE GREEN SQUARE}"
+SOLVED = "\N{LARGE GREEN SQUARE}" * 5
+
+
+def grid(*rows):
+    return "\n".join(rows)
+
+
+WORDLE_SAMPLES = [
+    (f"Wordle 1,234 3/6\n\n{grid(GUESS, GUESS, SOLVED)}", (1234, 3)),
+    (f"Wordle 1234 1/6\n\n{SOLVED}", (1234, 1)),
+    (f"Wordle 987 6/6\n\n{grid(*[GUESS] * 5, SOLVED)}", (987, 6)),
+    # Hard mode
+    (f"Wordle 1,234 3/6*\n\n{grid(GUESS, GUESS, SOLVED)}", (1234, 3)),
+    # Failed game, six guesses that all missed
+    (f"Wordle 1,234 X/6\n\n{grid(*[GUESS] * 6)}", (1234, None)),
+    # Anything after the grid is ignored
+    (f"Wordle 1,234 2/6\n\n{grid(GUESS, SOLVED)}\nphew <@1234> beat that", (1234, 2)),
+    # High contrast colors
+    (
+        "Wordle 1,234 2/6\n\n\N{LARGE ORANGE SQUARE}\N{LARGE BLUE SQUARE}\N{BLACK LARGE SQUARE}"
+        "\n\N{LARGE ORANGE SQUARE}\N{LARGE ORANGE SQUARE}",
+        (1234, 2)
+    ),
+]
+
+ADVERSARIAL_SAMPLES = [
+    "",
+    "Wordle",
+    "Wordle 1,234 3/6",
+    "wordle 1,234 1/6\n\n" + SOLVED,
+    " Wordle 1,234 1/6\n\n" + SOLVED,
+    "Wordle today was hard",
+    "Wordle 1,234 7/6\n\n" + SOLVED,
+    "Wordle 1,234 0/6\n\n" + SOLVED,
+    # Fewer rows than attempts
+    f"Wordle 1,234 3/6\n\n{grid(GUESS, SOLVED)}",
+    f"Wordle 1,234 X/6\n\n{GUESS}",
+    # No blank line before the grid
+    f"Wordle 1,234 2/6\n{grid(GUESS, SOLVED)}",
+    # Rows that aren't all result squares
+    f"Wordle 1,234 2/6\n\n{grid(GUESS, 'abc')}",
+    "Wordle 1,234 1/6\n\n\N{LARGE RED SQUARE}\N{LARGE GREEN SQUARE}",
+    f"Wordle 1,234 2/6\n\n{grid(GUESS, SOLVED + ' ')}",
+    "W" * 5000,
+    "Wordle " * 1000,
+]
+
+
+YELLOW = "\N{LARGE YELLOW SQUARE}" * 4
+GREEN = "\N{LARGE GREEN SQUARE}" * 4
+BLUE = "\N{LARGE BLUE SQUARE}" * 4
+PURPLE = "\N{LARGE PURPLE SQUARE}" * 4
+# One off, a mistake
+MISSED = "\N{LARGE BLUE SQUARE}\N{LARGE PURPLE SQUARE}\N{LARGE BLUE SQUARE}\N{LARGE BLUE SQUARE}"
+
+THEME = "\N{LEFT DOUBLE QUOTATION MARK}Down to earth\N{RIGHT DOUBLE QUOTATION MARK}"
+NERDLE_GUESS = "\N{LARGE PURPLE SQUARE}\N{BLACK LARGE SQUARE}\N{LARGE GREEN SQUARE}\N{BLACK LARGE SQUARE}" * 2
+NERDLE_SOLVED = "\N{LARGE GREEN SQUARE}" * 8
+
+# (content, (puzzle name, game id, attempts))
+PUZZLE_SAMPLES = [
+    (f"Connections\nPuzzle #512\n{grid(YELLOW, GREEN, BLUE, PURPLE)}", ("connections", 512, 1)),
+    (f"Connections \nPuzzle #1,012\n{grid(MISSED, YELLOW, GREEN, MISSED, BLUE, PURPLE)}", ("connections", 1012, 3)),
+    # Four mistakes end the game
+    (f"Connections\nPuzzle #512\n{grid(MISSED, YELLOW, MISSED, MISSED, GREEN, MISSED)}", ("connections", 512, None)),
+    ("Strands #210\n" + THEME + "\n\N{LARGE BLUE CIRCLE}\N{LARGE BLUE CIRCLE}\N{LARGE YELLOW CIRCLE}\n"
+     "\N{LARGE BLUE CIRCLE}\N{LARGE BLUE CIRCLE}", ("strands", 210, 1)),
+    ("Strands #210\n" + THEME + "\n\N{ELECTRIC LIGHT BULB}\N{LARGE BLUE CIRCLE}\N{LARGE YELLOW CIRCLE}\n"
+     "\N{LARGE BLUE CIRCLE}\N{ELECTRIC LIGHT BULB}\N{ELECTRIC LIGHT BULB}", ("strands", 210, 4)),
+    # Five or more hints share the last bucket
+    ("Strands #210\n" + THEME + "\n" + "\N{ELECTRIC LIGHT BULB}" * 7 + "\N{LARGE YELLOW CIRCLE}",
+     ("strands", 210, 6)),
+    (f"nerdlegame 812 3/6\n\n{grid(NERDLE_GUESS, NERDLE_GUESS, NERDLE_SOLVED)}", ("nerdle", 812, 3)),
+    (f"nerdlegame 812 X/6\n\n{grid(*[NERDLE_GUESS] * 6)}", ("nerdle", 812, None)),
+    (
+        "Framed #640\n\N{MOVIE CAMERA} \N{LARGE RED SQUARE} \N{LARGE RED SQUARE} \N{LARGE GREEN SQUARE} "
+        "\N{BLACK LARGE SQUARE} \N{BLACK LARGE SQUARE} \N{BLACK LARGE SQUARE}\n\nhttps://framed.wtf",
+        ("framed", 640, 3)
+    ),
+    # No green square, the movie was never named
+    (
+        "Framed #640\n\N{MOVIE CAMERA}" + " \N{LARGE RED SQUARE}" * 6 + "\n\nhttps://framed.wtf",
+        ("framed", 640, None)
+    ),
+]
+
+PUZZLE_ADVERSARIAL_SAMPLES = [
+    # Connections still in progress, and a grid with a short row
+    f"Connections\nPuzzle #512\n{grid(YELLOW, GREEN, MISSED, MISSED, MISSED)}",
+    f"Connections\nPuzzle #512\n{grid(YELLOW, GREEN, BLUE, PURPLE[:3])}",
+    "Connections\nPuzzle #512",
+    # Strands without a spangram, or without its theme line
+    "Strands #210\n" + THEME + "\n" + "\N{LARGE BLUE CIRCLE}" * 4,
+    "Strands #210\n\N{LARGE BLUE CIRCLE}\N{LARGE YELLOW CIRCLE}",
+    # Nerdle with too few rows or foreign squares
+    f"nerdlegame 812 3/6\n\n{grid(NERDLE_GUESS, NERDLE_SOLVED)}",
+    f"nerdlegame 812 2/6\n\n{NERDLE_GUESS}\n\N{LARGE YELLOW SQUARE}\N{LARGE YELLOW SQUARE}",
+    # Framed without the camera, or with too few squares
+    "Framed #640\n" + " \N{LARGE GREEN SQUARE}" * 6,
+    "Framed #640\n\N{MOVIE CAMERA} \N{LARGE RED SQUARE} \N{LARGE GREEN SQUARE}",
+]
+
+
+@pytest.mark.parametrize("content, expected", WORDLE_SAMPLES)
+def test_wordle_results(content, expected):
+    result = parse_result(content)
+    assert result is not None
+    assert result.puzzle.name == "wordle"
+    assert (result.gameid, result.attempts) == expected
+
+
+@pytest.mark.parametrize("content", ADVERSARIAL_SAMPLES)
+def test_rejects_non_results(content):
+    assert parse_result(content) is None
+
+
+@pytest.mark.parametrize("content, expected", PUZZLE_SAMPLES)
+def test_puzzle_results(content, expected):
+    name, gameid, attempts = expected
+    # The combined header pattern dispatches to the right puzzle
+    assert _HEADERS.match(content).lastgroup == name
+    result = parse_result(content)
+    assert result is not None
+    assert (result.puzzle.name, result.gameid, result.attempts) == expected
+
+
+@pytest.mark.parametrize("content", PUZZLE_ADVERSARIAL_SAMPLES)
+def test_rejects_malformed_puzzle_results(content):
+    assert parse_result(content) is None
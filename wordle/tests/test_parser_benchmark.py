@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from wordle.puzzles import parse_result
+
+from .test_parser import ADVERSARIAL_SAMPLES, WORDLE_SAMPLES
+
+CHATTER = [
+    "gm everyone",
+    "did anyone get today's word? took me forever",
+    "<@1234> you're up",
+    "Wow",
+    "https://www.nytimes.com/games/wordle/index.html",
+]
+
+
+def test_parse_results(benchmark):
+    samples = [content for content, _ in WORDLE_SAMPLES]
+    benchmark(lambda: [parse_result(content) for content in samples])
+
+
+def test_parse_adversarial(benchmark):
+    benchmark(lambda: [parse_result(content) for content in ADVERSARIAL_SAMPLES])
+
+
+def test_parse_chatter(benchmark):
+    # Most messages in the channel aren't results, and should be turned away by the prefilter
+    benchmark(lambda: [parse_result(content) for content in CHATTER])
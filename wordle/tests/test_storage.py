@@ -0,0 +1,50 @@
+import discord
+
+from .conftest import GUILD, count_writes, run_async, stored_stats
+from .test_concurrency import Channel, Context, history
+
+
+@run_async
+async def test_flush_writes_each_guild_once(cog, driver, monkeypatch):
+    for guild_id in (1, 2):
+        for member_id in range(200):
+            await cog._add_result(discord.Object(guild_id), discord.Object(member_id), 1000, 3)
+
+    writes = count_writes(driver, monkeypatch)
+    await cog._flush()
+
+    # Member stats and server results, one write per guild
+    assert len(writes) == 2
+    for guild_id in (1, 2):
+        for member_id in range(200):
+            assert list((await stored_stats(cog, member_id, guild_id))['gameids']) == [1000]
+
+
+@run_async
+async def test_member_stats_from_earlier_versions_are_moved(cog):
+    await cog.config.member_from_ids(GUILD.id, 1).set(
+        {'gameids': [1000, 1001, 1002], 'failedids': [], 'total_score': 12, 'qty': [0, 0, 3, 0, 0, 0]}
+    )
+
+    await cog._migrate_member_stats()
+
+    assert await cog.config.all_members() == {}
+    stats = await stored_stats(cog, 1)
+    assert list(stats['gameids']) == [1000, 1001, 1002]
+    assert stats['total_score'] == 12
+    # And picked up from there
+    await cog._add_result(GUILD, discord.Object(1), 1003, 1)
+    assert (await cog._get_stats(GUILD.id, 1))['wordle']['total_score'] == 22
+
+
+@run_async
+async def test_reparse_writes_guild_once(cog, driver, monkeypatch):
+    results = [(member_id, gameid, 3) for gameid in range(1000, 1010) for member_id in range(200)]
+    writes = count_writes(driver, monkeypatch)
+    await cog._reparse(Context(), Channel(history(results)), len(results), None)
+
+    # The stats, then clearing the checkpoint
+    assert len(writes) == 2
+    assert sum(cog._games[GUILD.id]['wordle'].totals) == len(results)
+    for member_id in range(200):
+        assert len((await stored_stats(cog, member_id))['gameids']) == 10
@@ -1,132 +1,344 @@
 import asyncio
-import re
+import logging
+import time
+from typing import Dict, Optional, Set, Tuple
+from weakref import WeakValueDictionary
 
 import discord
 from redbot.core import Config, checks, commands
+from redbot.core.utils.chat_formatting import humanize_number, humanize_timedelta
 from redbot.core.utils.predicates import ReactionPredicate
 from redbot.core.utils.menus import start_adding_reactions
 
+from .leaderboard import Leaderboard
+from .puzzles import PUZZLES_BY_NAME, WORDLE, Puzzle, PuzzleConverter, parse_result
+from .serverstats import ServerStats
+
+log = logging.getLogger("red.wordle")
+
+# Seconds between batched writes of changed member stats to Config
+FLUSH_INTERVAL = 30
+# Messages fetched ahead of the reparse parser
+REPARSE_QUEUE_SIZE = 500
+# Messages between saved reparse checkpoints
+REPARSE_CHECKPOINT_EVERY = 5000
+# Seconds between edits of the reparse progress message
+REPARSE_PROGRESS_INTERVAL = 5
+# Members per page of wordletop
+LEADERBOARD_PAGE_SIZE = 5
+# Games listed under recent and hardest in wordleserver
+SERVER_RECENT_GAMES = 7
+SERVER_HARDEST_GAMES = 5
+
 
 class Wordle(commands.Cog):
-    """Wordle cog to track statistics and streaks"""
+    """Wordle cog to track statistics and streaks, for Wordle and other daily puzzles"""
 
     def __init__(self, bot):
         super().__init__()
         self.bot = bot
         self.config = Config.get_conf(self, identifier=13330085047676266, force_registration=True)
 
-        default_guild = {'channelid': None}
+        # reparse holds the checkpoint of an unfinished wordlereparse, if any
+        default_guild = {'channelid': None, 'reparse': None}
         self.config.register_guild(**default_guild)
 
+        # A guild's stats in one record, so a flush or reparse writes each guild once however many members posted:
+        # members maps member id (as a string) to that member's stats, see _dump_stats;
+        # games maps puzzle name to the guild's results, see ServerStats.to_raw
+        self.config.init_custom("STATS", 1)
+        self.config.register_custom("STATS", members={}, games={})
+
+        # Where earlier versions kept member stats, only read to move them into STATS
         default_member = {
             'gameids': [],
+            'failedids': [],
             'total_score': 0,
-            'last_gameid': 0,
-            'curr_streak': 0,
-            'qty': [0, 0, 0, 0, 0, 0]
+            'qty': [0, 0, 0, 0, 0, 0],
+            'puzzles': {}
         }
 
         self.config.register_member(**default_member)
 
-        # Wordle verification regex
-        self.w = re.compile(r"Wordle (\d{0,3},?\d{3}) (\d{1})\/6")
-
-    def _parse_message(self, message):
-        """Parse message string and check if it's a valid wordle result"""
-
-        # Possible characters in wordle emoji grid
-        wordle_charset = {'\N{BLACK LARGE SQUARE}', \
-                          '\N{WHITE LARGE SQUARE}', \
-                          '\N{LARGE GREEN SQUARE}', \
-                          '\N{LARGE YELLOW SQUARE}',\
-                          '\N{LARGE ORANGE SQUARE}', \
-                          '\N{LARGE BLUE SQUARE}'}
-
-        # Split into lines
-        lines = message.clean_content.split('\n')
-
-        # Early exit for messages with less than 3 lines
-        if len(lines) < 3:
-            return None
-
-        # Parse first line 
-        match = self.w.match(lines[0])
-        if match is not None:
-            gameid = int(match.groups()[0].replace(",", ""))  # Remove comma if present
-            attempts = int(match.groups()[1])
-
-            # Early exit if attempts don't make sense
-            if attempts > 6:
-                return None
-
-            # Early exit for messages without requisite emoji rows
-            if len(lines) < attempts+2:
-                return None
-
-            # Integrity check of emoji grid
-            for i in range(2, attempts+2):
-                if not set(lines[i]) <= wordle_charset:
-                    return None
-
-            # Passed, return game info
-            return gameid, attempts
-        else:
-            return None
-
-
-    async def _add_result(self, guild, author, gameid, attempts):
-        """Add a user's wordle result to their record"""
+        # Write-behind member stats: (guild id, member id) -> stats, written to Config in batches
+        self._stats: Dict[Tuple[int, int], dict] = {}
+        # Only held while a result is being applied; idle locks are dropped with their last reference
+        self._locks: "WeakValueDictionary[Tuple[int, int], asyncio.Lock]" = WeakValueDictionary()
+        self._dirty: Set[Tuple[int, int]] = set()
+        # Write-behind guild-wide results: guild id -> puzzle name -> ServerStats, written with member stats
+        self._games: Dict[int, Dict[str, ServerStats]] = {}
+        self._dirty_games: Set[int] = set()
+        self._flush_task = None
+        # Held by _flush and by a reparse replacing a guild's stats, so neither writes over the other
+        self._write_lock = asyncio.Lock()
+        # (guild id, puzzle name) -> rankings, built on first use and then kept up to date by _add_result
+        self._leaderboards: Dict[Tuple[int, str], Leaderboard] = {}
+        # guild id -> member stats and guild-wide results being rebuilt by a running wordlereparse,
+        # which live results also go into
+        self._reparsing: Dict[int, Tuple[Dict[int, dict], Dict[str, ServerStats]]] = {}
+        # guild id -> wordle channel id, mirrors the channelid setting so messages can be filtered without Config
+        self._channels: Dict[int, int] = {}
+
+    async def cog_load(self):
+        await self._migrate_member_stats()
+        self._channels = {
+            guild_id: data['channelid']
+            for guild_id, data in (await self.config.all_guilds()).items()
+            if data['channelid'] is not None
+        }
+        self._flush_task = asyncio.create_task(self._flush_loop())
 
-        # Get previous stats
-        prev = await self.config.member(author).all()
+    async def _migrate_member_stats(self):
+        """Move stats stored per member by earlier versions into their guild's STATS record."""
+        legacy = await self.config.all_members()
+        if not legacy:
+            return
+        for guild_id, members in legacy.items():
+            group = self._stats_group(guild_id)
+            stored = await group.members()
+            for member_id, raw in members.items():
+                stored.setdefault(str(member_id), raw)
+            await group.members.set(stored)
+        await self.config.clear_all_members()
+        log.info(f"Moved Wordle stats of {len(legacy)} guilds to per-guild records")
+
+    def _stats_group(self, guild_id: int):
+        return self.config.custom("STATS", str(guild_id))
+
+    async def cog_unload(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        await self._flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self._flush()
+            except Exception:
+                log.exception("Error writing Wordle stats")
+
+    async def _flush(self):
+        """Write changed member stats and guild results to Config, one write per guild.
+        Writes that fail are kept for the next flush, and the first error is raised once the rest are done."""
+        async with self._write_lock:
+            # Snapshot without awaiting so no update can land halfway through
+            members: Dict[int, Dict[str, dict]] = {}
+            for guild_id, member_id in self._dirty:
+                members.setdefault(guild_id, {})[str(member_id)] = self._dump_stats(self._stats[guild_id, member_id])
+            self._dirty.clear()
+            games = {guild_id: self._dump_games(self._games[guild_id]) for guild_id in self._dirty_games}
+            self._dirty_games.clear()
+
+            error = None
+            try:
+                for guild_id in list(members.keys() | games.keys()):
+                    try:
+                        group = self._stats_group(guild_id)
+                        stored = await group.all()
+                        stored['members'].update(members.get(guild_id, {}))
+                        if guild_id in games:
+                            stored['games'] = games[guild_id]
+                        await group.set(stored)
+                    except Exception as e:
+                        error = error or e
+                    else:
+                        members.pop(guild_id, None)
+                        games.pop(guild_id, None)
+            finally:
+                # Whatever wasn't written, because it failed or the flush was cancelled, goes in the next flush
+                self._dirty.update(
+                    (guild_id, int(member_id)) for guild_id, raws in members.items() for member_id in raws
+                )
+                self._dirty_games.update(games)
+
+            if error is not None:
+                raise error
+
+    def _lock(self, guild_id: int, member_id: int) -> asyncio.Lock:
+        key = (guild_id, member_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            # Keep a strong reference until it's returned, or it could vanish right away
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    @staticmethod
+    def _load_stats(raw: dict) -> dict:
+        """Turn member stats from Config into their in-memory form, puzzle name -> that puzzle's stats.
+        Wordle's stats sit at the top level of the stored record so older records still load."""
+        stats = {WORDLE.name: WORDLE.load_stats(raw)}
+        for name, puzzle_raw in raw.get('puzzles', {}).items():
+            if name in PUZZLES_BY_NAME:
+                stats[name] = PUZZLES_BY_NAME[name].load_stats(puzzle_raw)
+        return stats
+
+    @staticmethod
+    def _new_stats() -> dict:
+        return {WORDLE.name: WORDLE.new_stats()}
+
+    @staticmethod
+    def _dump_stats(stats: dict) -> dict:
+        """Copy in-memory member stats into the form stored in Config."""
+        raw = WORDLE.dump_stats(stats[WORDLE.name])
+        raw['puzzles'] = {
+            name: PUZZLES_BY_NAME[name].dump_stats(puzzle_stats)
+            for name, puzzle_stats in stats.items()
+            if name != WORDLE.name
+        }
+        return raw
+
+    @staticmethod
+    def _load_games(raw: dict) -> Dict[str, ServerStats]:
+        return {
+            name: ServerStats.from_raw(PUZZLES_BY_NAME[name].max_attempts, puzzle_raw)
+            for name, puzzle_raw in raw.items()
+            if name in PUZZLES_BY_NAME
+        }
 
-        # Avoid duplicates
-        async with self.config.member(author).gameids() as gameids:
-            if gameid in gameids:
-                return
-            else:
-                gameids.append(gameid)
+    @staticmethod
+    def _dump_games(games: Dict[str, ServerStats]) -> dict:
+        return {name: stats.to_raw() for name, stats in games.items()}
+
+    @staticmethod
+    def _count_game(games: Dict[str, ServerStats], gameid: int, attempts: Optional[int], puzzle: Puzzle):
+        if puzzle.name not in games:
+            games[puzzle.name] = ServerStats(puzzle.max_attempts)
+        games[puzzle.name].add(gameid, attempts)
+
+    async def _get_games(self, guild_id: int) -> Dict[str, ServerStats]:
+        """A guild's results per puzzle, including changes not yet written to Config."""
+        if guild_id not in self._games:
+            games = self._load_games(await self._stats_group(guild_id).games())
+            # Another task may have loaded it while we waited
+            self._games.setdefault(guild_id, games)
+        return self._games[guild_id]
+
+    async def _get_stats(self, guild_id: int, member_id: int) -> dict:
+        """A member's current stats, including changes not yet written to Config."""
+        key = (guild_id, member_id)
+        if key not in self._stats:
+            raw = await self._stats_group(guild_id).members.get_raw(str(member_id), default=None)
+            stats = self._load_stats(raw) if raw is not None else self._new_stats()
+            # Another task may have loaded it while we waited
+            self._stats.setdefault(key, stats)
+        return self._stats[key]
+
+    async def _all_member_stats(self, guild) -> Dict[int, dict]:
+        """Every member's stats in a guild, with unwritten changes applied."""
+        members = {
+            int(member_id): self._load_stats(raw)
+            for member_id, raw in (await self._stats_group(guild.id).members()).items()
+        }
+        for (guild_id, member_id), stats in self._stats.items():
+            if guild_id == guild.id:
+                members[member_id] = stats
+        return members
+
+    def _forget_guild(self, guild_id: int):
+        """Drop cached and unwritten stats for a guild, e.g. after its stats were cleared."""
+        for key in [key for key in self._stats if key[0] == guild_id]:
+            del self._stats[key]
+            self._dirty.discard(key)
+        for key in [key for key in self._leaderboards if key[0] == guild_id]:
+            del self._leaderboards[key]
+        self._games.pop(guild_id, None)
+        self._dirty_games.discard(guild_id)
+
+    async def _leaderboard(self, guild, puzzle: Puzzle) -> Leaderboard:
+        """The guild's rankings for a puzzle, built from its stats the first time they are needed."""
+        key = (guild.id, puzzle.name)
+        if key not in self._leaderboards:
+            leaderboard = Leaderboard()
+            for member_id, stats in (await self._all_member_stats(guild)).items():
+                if puzzle.name in stats:
+                    leaderboard.update(member_id, stats[puzzle.name])
+            # Another task may have built it while we waited
+            self._leaderboards.setdefault(key, leaderboard)
+        return self._leaderboards[key]
+
+    @staticmethod
+    def _parse_message(message):
+        """Parse message string and check if it's a valid result of any tracked puzzle.
+        Returns a Result, whose attempts is None for a failed game.
+
+        The raw content is enough since mentions never appear in a result, so the
+        costly clean_content is never built.
+        """
+        return parse_result(message.content)
 
-        # Update score
-        if attempts == 1:
-            # First guess gets 10 points
-            add_score = 10
-        else:
-            # Second guess gets 5, third guess gets 4, etc.
-            add_score = 7 - attempts
-        await self.config.member(author).total_score.set(prev['total_score'] + add_score)
+    async def _add_result(self, guild, author, gameid, attempts, puzzle: Puzzle = WORDLE):
+        """Add a user's puzzle result to their record.
 
-        if gameid - prev['last_gameid'] == 1:
-            await self.config.member(author).last_gameid.set(gameid)
-            await self.config.member(author).curr_streak.set(prev['curr_streak']+1)
-        else:
-            await self.config.member(author).last_gameid.set(gameid)
-            await self.config.member(author).curr_streak.set(1)
+        The whole read-modify-write happens under the member's lock, on the cached
+        stats, and is written to Config by the next flush. A new result is also
+        counted in the guild's histogram for that game. While the guild is being
+        reparsed the result also goes into the rebuilt stats, so it survives the swap.
+        """
+        if guild.id in self._reparsing:
+            # Duplicates are ignored, so it doesn't matter if the reparse also reaches this message
+            members, games = self._reparsing[guild.id]
+            rebuilt = members.setdefault(author.id, self._new_stats())
+            if self._apply_result(rebuilt, gameid, attempts, puzzle):
+                self._count_game(games, gameid, attempts, puzzle)
+
+        async with self._lock(guild.id, author.id):
+            await self._get_games(guild.id)
+            stats = await self._get_stats(guild.id, author.id)
+            if self._apply_result(stats, gameid, attempts, puzzle):
+                # Looked up again after the awaits, a finished reparse may have swapped it out
+                self._count_game(self._games[guild.id], gameid, attempts, puzzle)
+                self._dirty.add((guild.id, author.id))
+                self._dirty_games.add(guild.id)
+                if (guild.id, puzzle.name) in self._leaderboards:
+                    self._leaderboards[guild.id, puzzle.name].update(author.id, stats[puzzle.name])
+
+    @staticmethod
+    def _apply_result(stats: dict, gameid: int, attempts: Optional[int], puzzle: Puzzle = WORDLE) -> bool:
+        """Add a result to in-memory member stats, attempts being None for a failed game.
+        Returns False if the game was already recorded."""
+        if puzzle.name not in stats:
+            stats[puzzle.name] = puzzle.new_stats()
+        return puzzle.apply(stats[puzzle.name], gameid, attempts)
+
+    @staticmethod
+    def _histogram(puzzle: Puzzle, counts: list) -> str:
+        """Bar chart of solves per attempts bucket, then failed games, from a non-empty list of counts."""
+        total = sum(counts)
+        percs = [int((x/total)*100) for x in counts]
+        histmax = max(counts)
+        histlens = [int((x/histmax)*10) for x in counts]
+        histbars = ['\N{LARGE GREEN SQUARE}'*h for h in histlens]
 
-        # Update qty
-        newhist = prev['qty'].copy()
-        newhist[attempts-1] += 1
-        await self.config.member(author).set_raw('qty', value=newhist)
+        histogram = ""
+        for attempts in range(1, puzzle.max_attempts + 1):
+            i = attempts - 1
+            histogram += f"{puzzle.histogram_label(attempts)} {histbars[i]} {counts[i]} ({percs[i]}%)\n"
+        if puzzle.can_fail:
+            histogram += f"\N{CROSS MARK} {histbars[-1]} {counts[-1]} ({percs[-1]}%)\n"
+        return histogram
 
     @commands.command()
-    async def wordlestats(self, ctx: commands.Context, member: discord.Member):
+    async def wordlestats(self, ctx: commands.Context, member: discord.Member, puzzle: PuzzleConverter = WORDLE):
         """Retrieve Wordle Statistics for a single user
+        Pass a puzzle name, e.g. `connections`, for another puzzle's statistics.
 
         Statistics to be returned:
-        - Solve count histogram (freq 1~6)
+        - Solve count histogram (freq 1~6, plus failed games)
         - Total score (inverted score)
         - Current streak (days)
         """
 
-        memberstats = await self.config.member(member).all()
+        memberstats = (await self._get_stats(ctx.guild.id, member.id)).get(puzzle.name) or puzzle.new_stats()
 
-        totalgames = len(memberstats['gameids'])
+        fails = len(memberstats['failedids'])
+        totalgames = len(memberstats['gameids']) + fails
 
         # Build embed
-        channelid = await self.config.guild(ctx.guild).channelid()
+        channelid = self._channels.get(ctx.guild.id)
         refchannel = ctx.guild.get_channel(channelid).mention if channelid is not None else "N/A"
         embed = discord.Embed(
-            title=f"{member.display_name}'s Wordle Statistics",
+            title=f"{member.display_name}'s {puzzle.label} Statistics",
             description=f"Pulled from messages in {refchannel}",
             color=await self.bot.get_embed_color(ctx)
         )
@@ -137,88 +349,132 @@ class Wordle(commands.Cog):
             await ctx.send(embed=embed, allowed_mentions=None)
             return
 
-        # Calculate values for histogram
-        percs = [int((x/totalgames)*100) for x in memberstats['qty']]
-        histmax = max(memberstats['qty'])
-        histlens = [int((x/histmax)*10) for x in memberstats['qty']]
-        histbars = ['\N{LARGE GREEN SQUARE}'*h for h in histlens]
-
-        # Build histogram
-        histogram = ""
-        histogram += f"{totalgames} recorded games\n"
-        histogram += f"1\N{COMBINING ENCLOSING KEYCAP} {histbars[0]} {memberstats['qty'][0]} ({percs[0]}%)\n"
-        histogram += f"2\N{COMBINING ENCLOSING KEYCAP} {histbars[1]} {memberstats['qty'][1]} ({percs[1]}%)\n"
-        histogram += f"3\N{COMBINING ENCLOSING KEYCAP} {histbars[2]} {memberstats['qty'][2]} ({percs[2]}%)\n"
-        histogram += f"4\N{COMBINING ENCLOSING KEYCAP} {histbars[3]} {memberstats['qty'][3]} ({percs[3]}%)\n"
-        histogram += f"5\N{COMBINING ENCLOSING KEYCAP} {histbars[4]} {memberstats['qty'][4]} ({percs[4]}%)\n"
-        histogram += f"6\N{COMBINING ENCLOSING KEYCAP} {histbars[5]} {memberstats['qty'][5]} ({percs[5]}%)\n"
+        histogram = f"{totalgames} recorded games\n" + self._histogram(puzzle, memberstats['qty'] + [fails])
 
         embed.add_field(name="Histogram", value=histogram)
         embed.add_field(name="Total Score", value=memberstats['total_score'], inline=False)
-        embed.add_field(name="Current Streak", value=memberstats['curr_streak'], inline=True)
+        embed.add_field(name="Current Streak", value=puzzle.streak(memberstats), inline=True)
 
         await ctx.send(embed=embed, allowed_mentions=None)
 
     @commands.command()
-    async def wordletop(self, ctx: commands.Context):
-        """Show the Wordle top-5 leaderboard for total points and average attempts per solve."""
-
-        # Get scores and sort them 
-        memberstats = await self.config.all_members(guild=ctx.guild)
-        members = memberstats.keys()
-
-        # Total scores (higher=better)
-        scores = [{'member': m, 'total_score': memberstats[m]['total_score'], 'n_games': len(memberstats[m]['gameids'])} for m in members]
-        scores = sorted(scores, key=lambda d: d['total_score'], reverse=True)
-
-        # Average attempts (lower=better)
-        avg_attempts = [{'member': m, 'avg_attempt': sum([q*s for q, s in zip(memberstats[m]['qty'], [1,2,3,4,5,6])]) / len(memberstats[m]['gameids'])} for m in members]
-        avg_attempts = sorted(avg_attempts, key=lambda d: d['avg_attempt'])
-
-        # Build total score leaderboard
-        prefixes = [f"\N{FIRST PLACE MEDAL}", f"\N{SECOND PLACE MEDAL}", f"\N{THIRD PLACE MEDAL}", "4.", "5."]
-        leaderboard = ""
-        if len(members) == 0:
-            leaderboard = "No members found."
-        else:
-            for i in range(min(5, len(members))):
-                this_member = ctx.guild.get_member(scores[i]['member'])
-                if this_member is None:
-                    # Member left the server
-                    leaderboard += f"{prefixes[i]} <unknown> ({scores[i]['total_score']} points, {scores[i]['n_games']} solves)\n"
-                else:
-                    leaderboard += f"{prefixes[i]} {this_member.mention} ({scores[i]['total_score']} points, {scores[i]['n_games']} solves)\n"
-        leaderboard = leaderboard.rstrip()
-
-        # Build avg attempt leaderboard
-        avgboard = ""
-        if len(members) == 0:
-            avgboard = "No members found."
-        else:
-            for i in range(min(5, len(members))):
-                this_member = ctx.guild.get_member(avg_attempts[i]['member'])
-                if this_member is None:
-                    # Member left the server
-                    avgboard += f"{prefixes[i]} <unknown> ({avg_attempts[i]['avg_attempt']:.2f} per solve)\n"
-                else:
-                    avgboard += f"{prefixes[i]} {this_member.mention} ({avg_attempts[i]['avg_attempt']:.2f} per solve)\n"
-        avgboard = avgboard.rstrip()
+    async def wordletop(self, ctx: commands.Context, puzzle: Optional[PuzzleConverter] = None, page: int = 1):
+        """Show the Wordle leaderboard for total points and average attempts per solve.
+        Pass a puzzle name, e.g. `connections`, for another puzzle's leaderboard,
+        and a page number to see further down the rankings."""
+
+        puzzle = puzzle or WORDLE
+        leaderboard = await self._leaderboard(ctx.guild, puzzle)
+        page = max(page, 1)
+        start = (page - 1) * LEADERBOARD_PAGE_SIZE
+        medals = ["\N{FIRST PLACE MEDAL}", "\N{SECOND PLACE MEDAL}", "\N{THIRD PLACE MEDAL}"]
+
+        def prefix(rank):
+            return medals[rank-1] if rank <= len(medals) else f"{rank}."
+
+        def name(member_id):
+            this_member = ctx.guild.get_member(member_id)
+            # Member left the server
+            return this_member.mention if this_member is not None else "<unknown>"
+
+        # Build total score leaderboard (higher=better)
+        leaderboard_text = "\n".join(
+            f"{prefix(rank)} {name(standing.member_id)} ({standing.total_score} points, {standing.n_games} solves)"
+            for rank, standing in enumerate(leaderboard.top_scores(start, LEADERBOARD_PAGE_SIZE), start + 1)
+        ) or "No members found."
+
+        # Build avg attempt leaderboard (lower=better)
+        avgboard = "\n".join(
+            f"{prefix(rank)} {name(standing.member_id)} ({puzzle.format_average(standing.avg_attempts)})"
+            for rank, standing in enumerate(leaderboard.top_averages(start, LEADERBOARD_PAGE_SIZE), start + 1)
+        ) or "No members found."
 
         # Build embed
-        channelid = await self.config.guild(ctx.guild).channelid()
+        channelid = self._channels.get(ctx.guild.id)
         refchannel = ctx.guild.get_channel(channelid).mention if channelid is not None else "N/A"
         embed = discord.Embed(
-            title=f"{ctx.guild.name} Wordle Leaderboard",
+            title=f"{ctx.guild.name} {puzzle.label} Leaderboard",
             description=f"Share your results in {refchannel}",
             color=await self.bot.get_embed_color(ctx)
         )
-        embed.add_field(name="Total Points", value=leaderboard)
-        embed.add_field(name="Average Attempts", value=avgboard, inline=True)
+        embed.add_field(name="Total Points", value=leaderboard_text)
+        embed.add_field(name=puzzle.average_title, value=avgboard, inline=True)
 
-        embed.add_field(name="Point Values", value="1 attempt: 10 pts\n2 attempts: 5 pts\n3 attempts: 4 pts\n4 attempts: 3 pts\n5 attempts: 2 pts\n6 attempts: 1 pt", inline=False)
+        score_rank = leaderboard.score_rank(ctx.author.id)
+        if score_rank is not None:
+            average_rank = leaderboard.average_rank(ctx.author.id)
+            your_rank = f"#{score_rank} of {len(leaderboard)} by points"
+            if average_rank is not None:
+                your_rank += f", #{average_rank} of {leaderboard.n_ranked_averages} by {puzzle.average_title.lower()}"
+            embed.add_field(name="Your Rank", value=your_rank, inline=False)
+
+        embed.add_field(name="Point Values", value=puzzle.scoring, inline=False)
+        pages = max(-(-len(leaderboard) // LEADERBOARD_PAGE_SIZE), 1)
+        embed.set_footer(text=f"Page {page}/{pages}")
 
         await ctx.send(embed=embed, allowed_mentions=None)
 
+    @commands.command()
+    async def wordleserver(self, ctx: commands.Context, puzzle: Optional[PuzzleConverter] = None, gameid: int = None):
+        """Show server-wide Wordle statistics: solve rates, the attempts histogram and the hardest puzzles.
+        Pass a puzzle name, e.g. `connections`, for another puzzle's statistics,
+        and a game id to see how the server did on that game.
+        """
+
+        puzzle = puzzle or WORDLE
+        stats = (await self._get_games(ctx.guild.id)).get(puzzle.name) or ServerStats(puzzle.max_attempts)
+
+        def summary(counts):
+            average = stats.average_attempts(counts)
+            text = f"{sum(counts)} players, {stats.solve_rate(counts):.0%} solved"
+            return text + (f", {puzzle.format_average(average)}" if average is not None else "")
+
+        # Build embed
+        channelid = self._channels.get(ctx.guild.id)
+        refchannel = ctx.guild.get_channel(channelid).mention if channelid is not None else "N/A"
+        embed = discord.Embed(
+            title=f"{ctx.guild.name} {puzzle.label} Statistics" + (f" for #{gameid}" if gameid is not None else ""),
+            description=f"Pulled from messages in {refchannel}",
+            color=await self.bot.get_embed_color(ctx)
+        )
+
+        if gameid is not None:
+            counts = stats.games.get(gameid)
+            if counts is None:
+                embed.add_field(name="Error", value=f"No results found for #{gameid}")
+            else:
+                embed.add_field(name="Results", value=summary(counts), inline=False)
+                embed.add_field(name="Histogram", value=self._histogram(puzzle, counts))
+            await ctx.send(embed=embed, allowed_mentions=None)
+            return
+
+        if not len(stats):
+            # Results from before the server totals were kept only show up after a reparse
+            embed.add_field(
+                name="Error",
+                value=f"No games found. Run `{ctx.clean_prefix}wordlereparse` to count results already posted."
+            )
+            await ctx.send(embed=embed, allowed_mentions=None)
+            return
+
+        results = sum(stats.totals)
+        average = stats.average_attempts(stats.totals)
+        overall = f"{results} results over {len(stats)} games, {stats.solve_rate(stats.totals):.0%} solved"
+        if average is not None:
+            overall += f", {puzzle.format_average(average)}"
+        embed.add_field(name="Overall", value=overall, inline=False)
+        embed.add_field(name="Histogram", value=self._histogram(puzzle, stats.totals))
+
+        recent = "\n".join(f"#{gameid}: {summary(counts)}" for gameid, counts in stats.recent(SERVER_RECENT_GAMES))
+        embed.add_field(name="Recent Games", value=recent, inline=False)
+
+        hardest = "\n".join(
+            f"{rank}. #{gameid}: {summary(counts)}"
+            for rank, (gameid, counts) in enumerate(stats.hardest(SERVER_HARDEST_GAMES), 1)
+        ) or "Not enough players yet."
+        embed.add_field(name="Hardest Games", value=hardest, inline=False)
+
+        await ctx.send(embed=embed, allowed_mentions=None)
 
     @commands.command()
     @checks.mod_or_permissions(administrator=True)
@@ -228,48 +484,170 @@ class Wordle(commands.Cog):
         """
         if channel is not None:
             await self.config.guild(ctx.guild).channelid.set(channel.id)
+            self._channels[ctx.guild.id] = channel.id
             await ctx.send(f"Wordle channel has been set to {channel.mention}")
         else:
             await self.config.guild(ctx.guild).channelid.set(None)
+            self._channels.pop(ctx.guild.id, None)
             await ctx.send("Wordle channel has been cleared")
 
     @commands.command()
     @checks.mod_or_permissions(administrator=True)
-    async def wordlereparse(self, ctx: commands.Context, history_limit: int = 1000):
+    async def wordlereparse(self, ctx: commands.Context, history_limit: int = 1000, resume: bool = False):
         """Reparse wordle results from channel history. Number specifies message limit.
-        This might take a while for large channels.
+        This might take a while for large channels. Progress is checkpointed, so an
+        interrupted reparse can pick up where it stopped with `resume` set to true.
         """
 
         # Make sure a wordle channel is set first.
-        channelid = await self.config.guild(ctx.guild).channelid()
+        channelid = self._channels.get(ctx.guild.id)
         if channelid is None:
             await ctx.send("Set a wordle channel with !setwordlechannel first!")
             return
+        channel = ctx.guild.get_channel(channelid)
+
+        checkpoint = None
+        if resume:
+            checkpoint = await self.config.guild(ctx.guild).reparse()
+            if checkpoint is None or checkpoint['channel_id'] != channelid:
+                await ctx.send("There is no unfinished reparse of this channel to resume.")
+                return
+            history_limit = checkpoint['limit']
+            question = f"Resume reparse of {channel.mention} at {checkpoint['scanned']}/{history_limit} msgs?"
+        else:
+            question = f"Reparse {history_limit} msgs in {channel.mention}?"
 
         #Reaction poll
-        msg = await ctx.send(f"Reparse {history_limit} msgs in {ctx.guild.get_channel(channelid).mention}?")
+        msg = await ctx.send(question)
         start_adding_reactions(msg, ReactionPredicate.YES_OR_NO_EMOJIS)
 
         pred = ReactionPredicate.yes_or_no(msg, ctx.author)
         await ctx.bot.wait_for("reaction_add", check=pred)
         if pred.result is True:
-            await ctx.send("Starting reparse.")
-            # Clear existing data
-            await self.config.clear_all_members(guild=ctx.guild)
-
-            # Go through message history and reload results
-            channel = ctx.guild.get_channel(channelid)
-            async for message in channel.history(limit=history_limit, oldest_first=True):
-                gameinfo = self._parse_message(message)
-
-                if gameinfo is not None:
-                    await self._add_result(message.guild, message.author, gameinfo[0], gameinfo[1])
-            
+            if ctx.guild.id in self._reparsing:
+                await ctx.send("A reparse is already running.")
+                return
+            try:
+                await self._reparse(ctx, channel, history_limit, checkpoint)
+            except discord.HTTPException as e:
+                log.warning(f"Wordle reparse of {channel.id} interrupted: {e!r}")
+                await ctx.send(
+                    f"Reparse interrupted: {e.text or e}. "
+                    f"Run `{ctx.clean_prefix}wordlereparse {history_limit} true` to resume from the last checkpoint."
+                )
+                return
             await ctx.send(f"Wordle results successfully loaded.")
         else:
             await ctx.send("Nevermind then.")
             return
 
+    async def _reparse(
+        self, ctx: commands.Context, channel: discord.TextChannel, history_limit: int, checkpoint: Optional[dict]
+    ):
+        """
+        Rebuild a guild's stats from channel history.
+
+        A producer pages through history while results are parsed and
+        aggregated in memory, so fetching the next page overlaps with parsing
+        the last one. Stats are only written once at the end; in between, a
+        checkpoint of the partial aggregate is saved every
+        REPARSE_CHECKPOINT_EVERY messages so the reparse can be resumed.
+        """
+        guild = ctx.guild
+        members: Dict[int, dict] = {}
+        games: Dict[str, ServerStats] = {}
+        scanned = 0
+        last_message_id = None
+        if checkpoint is not None:
+            members = {int(member_id): self._load_stats(raw) for member_id, raw in checkpoint['members'].items()}
+            # Checkpoints saved before server totals were kept have none
+            games = self._load_games(checkpoint.get('games', {}))
+            scanned = checkpoint['scanned']
+            last_message_id = checkpoint['last_message_id']
+        self._reparsing[guild.id] = (members, games)
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=REPARSE_QUEUE_SIZE)
+
+        async def produce():
+            after = discord.Object(last_message_id) if last_message_id is not None else None
+            try:
+                async for message in channel.history(limit=history_limit - scanned, after=after, oldest_first=True):
+                    await queue.put(message)
+            finally:
+                # End of history, or the fetch failed and the error is raised when awaiting the producer
+                await queue.put(None)
+
+        async def save_checkpoint():
+            await self.config.guild(guild).reparse.set({
+                'channel_id': channel.id,
+                'limit': history_limit,
+                'scanned': scanned,
+                'last_message_id': last_message_id,
+                'members': {str(member_id): self._dump_stats(stats) for member_id, stats in members.items()},
+                'games': self._dump_games(games)
+            })
+
+        started = time.monotonic()
+        started_at = scanned
+        last_progress = started
+        progress = await ctx.send(f"Starting reparse at {humanize_number(scanned)}/{humanize_number(history_limit)} msgs.")
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                scanned += 1
+                last_message_id = message.id
+
+                result = self._parse_message(message)
+                if result is not None:
+                    stats = members.setdefault(message.author.id, self._new_stats())
+                    if self._apply_result(stats, result.gameid, result.attempts, result.puzzle):
+                        self._count_game(games, result.gameid, result.attempts, result.puzzle)
+
+                if scanned % REPARSE_CHECKPOINT_EVERY == 0:
+                    await save_checkpoint()
+                now = time.monotonic()
+                if now - last_progress >= REPARSE_PROGRESS_INTERVAL:
+                    last_progress = now
+                    rate = (scanned - started_at) / (now - started)
+                    eta = humanize_timedelta(seconds=int((history_limit - scanned) / rate)) if rate else None
+                    await progress.edit(
+                        content=f"Reparsing {channel.mention}: {humanize_number(scanned)}/{humanize_number(history_limit)} msgs, "
+                                f"{rate:.0f} msgs/sec, ETA {eta or 'a few seconds'}."
+                    )
+            # Surfaces errors from fetching history
+            await producer
+
+            # Live results keep going into the rebuilt stats until the lock is ours, so none are lost while waiting
+            async with self._write_lock:
+                # Stop collecting live results and swap the rebuilt stats into the cache without awaiting,
+                # so no live result can land in between; later ones go to the swapped-in stats
+                del self._reparsing[guild.id]
+                self._forget_guild(guild.id)
+                for member_id, stats in members.items():
+                    self._stats[guild.id, member_id] = stats
+                self._games[guild.id] = games
+                # A flush can't run until the guild's stored stats are replaced, in one write
+                await self._stats_group(guild.id).set({
+                    'members': {str(member_id): self._dump_stats(stats) for member_id, stats in members.items()},
+                    'games': self._dump_games(games)
+                })
+        except discord.HTTPException:
+            await save_checkpoint()
+            raise
+        finally:
+            producer.cancel()
+            self._reparsing.pop(guild.id, None)
+
+        await self.config.guild(guild).reparse.set(None)
+        elapsed = time.monotonic() - started
+        await progress.edit(
+            content=f"Reparsed {humanize_number(scanned)} msgs in {humanize_timedelta(seconds=int(elapsed)) or 'a moment'}, "
+                    f"found results for {len(members)} members."
+        )
+
     @commands.Cog.listener()
     async def on_message_without_command(self, message: discord.Message):
         """Listen to users posting their wordle results and add them to stats"""
@@ -280,29 +658,33 @@ class Wordle(commands.Cog):
         if message.guild is None: return
 
         # Only listen to messages from set channel
-        if message.channel.id != await self.config.guild(message.guild).channelid(): return
+        if message.channel.id != self._channels.get(message.guild.id): return
 
         # Check if valid message
-        gameinfo = self._parse_message(message)
-        if gameinfo is not None:
+        result = self._parse_message(message)
+        if result is not None:
             # Add result
-            await self._add_result(message.guild, message.author, gameinfo[0], gameinfo[1])
+            await self._add_result(message.guild, message.author, result.gameid, result.attempts, result.puzzle)
 
             # Notify user
-            if gameinfo[1] == 1:
+            attempts, worst = result.attempts, result.puzzle.max_attempts
+            if attempts is None:
+                await message.channel.send(
+                    f"Tough one, {message.author.mention}. Updated stats."
+                )
+            elif attempts == 1:
                 await message.channel.send(
                     f"Fantastic solve, {message.author.mention}!!! Updated stats."
                 )
-            if gameinfo[1] <= 3:
+            elif attempts <= worst // 2:
                 await message.channel.send(
                     f"Great solve, {message.author.mention}! Updated stats."
                 )
-            elif gameinfo[1] < 6:
+            elif attempts < worst:
                 await message.channel.send(
                     f"Nice solve, {message.author.mention}. Updated stats."
                 )
-            elif gameinfo[1] == 6:
+            else:
                 await message.channel.send(
                     f"Close call, {message.author.mention}. Updated stats."
                 )
-